@@ -0,0 +1,84 @@
+"""对比 基于临时文件的 concat() 与 纯管道的 render() 的耗时
+
+用法：python bench/bench_render.py [片段数] [重复次数]
+需要 ffmpeg 在 PATH 中；测试片段用 ffmpeg 的 sine 源临时生成。
+"""
+import os
+import sys
+import time
+import tempfile
+import shutil
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.audio_concat import AudioConcatenator
+from core.ffmpeg_utils import get_ffmpeg_path, run_ffmpeg
+
+
+def make_clips(folder, count):
+    """生成 count 个 0.3 秒的 mp3 测试片段"""
+    clips = []
+    for i in range(count):
+        path = os.path.join(folder, f"clip_{i}.mp3")
+        run_ffmpeg(
+            [
+                get_ffmpeg_path(),
+                "-f",
+                "lavfi",
+                "-i",
+                f"sine=frequency={200 + i * 10}:duration=0.3",
+                "-c:a",
+                "libmp3lame",
+                "-b:a",
+                "128k",
+                "-y",
+                path,
+            ]
+        )
+        clips.append(os.path.abspath(path))
+    return clips
+
+
+def timeit(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    folder = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        clips = make_clips(folder, count)
+        out_file = os.path.join(folder, "out.mp3")
+        concatenator = AudioConcatenator()
+
+        def file_based():
+            # 服务场景下调用方要的是 bytes，所以把读回文件也算进去
+            concatenator.concat(clips, out_file)
+            with open(out_file, "rb") as f:
+                return f.read()
+
+        results = {
+            "concat() + 读文件": timeit(file_based, repeat),
+            "render() -> bytes": timeit(lambda: concatenator.render(clips), repeat),
+        }
+
+        print(f"片段数 {count}，重复 {repeat} 次")
+        for name, times in results.items():
+            print(
+                f"{name:<20} 中位数 {statistics.median(times) * 1000:8.1f} ms"
+                f"  最小 {min(times) * 1000:8.1f} ms"
+            )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
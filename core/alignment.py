@@ -0,0 +1,59 @@
+"""逐字时间轴：直接用音频库里记录的片段时长推算，不需要再分析输出音频"""
+
+import os
+import json
+
+
+def build_alignment(items):
+    """items: [(字符, 时长秒), ...]，按拼接顺序；返回 [{char, start, end}, ...]
+
+    字符为 None 的项（如停顿）只推进时间，不输出。
+    """
+    alignment = []
+    t = 0.0
+    for char, seconds in items:
+        if char is not None:
+            alignment.append(
+                {"char": char, "start": round(t, 3), "end": round(t + seconds, 3)}
+            )
+        t += seconds
+    return alignment
+
+
+def library_alignment(library, selection):
+    """selection 为 AudioLibrary.select() 的结果，时长取自音频库元数据"""
+    alignment = build_alignment((c, library.duration(p)) for c, p in selection)
+    library.save_meta()
+    return alignment
+
+
+def _srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def to_srt(alignment):
+    blocks = []
+    for i, item in enumerate(alignment, 1):
+        blocks.append(
+            f"{i}\n{_srt_time(item['start'])} --> {_srt_time(item['end'])}\n"
+            f"{item['char']}\n"
+        )
+    return "\n".join(blocks)
+
+
+def to_json(alignment):
+    return json.dumps(alignment, ensure_ascii=False, indent=2)
+
+
+def write_alignment(alignment, path):
+    """按扩展名写出 .srt 或 .json"""
+    if os.path.splitext(path)[1].lower() == ".srt":
+        text = to_srt(alignment)
+    else:
+        text = to_json(alignment)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
@@ -1,22 +1,128 @@
-# core/audio_concat.py
 import os
-from .ffmpeg_utils import get_ffmpeg_path, run_ffmpeg
+import asyncio
+import weakref
+from .ffmpeg_utils import (
+    get_ffmpeg_path,
+    run_ffmpeg,
+    pipe_ffmpeg,
+    run_ffmpeg_async,
+)
 from .temp_manager import TempDir
+from . import pcm
+
+# 扩展名 → ffmpeg 封装格式
+_EXT_FORMATS = {
+    ".mp3": "mp3",
+    ".wav": "wav",
+    ".flac": "flac",
+    ".opus": "opus",
+    ".ogg": "ogg",
+    ".m4a": "ipod",
+    ".aac": "adts",
+}
+# 封装格式 → (默认编码器, 默认码率)，无损格式不设码率
+_FORMAT_CODECS = {
+    "mp3": ("libmp3lame", "192k"),
+    "wav": ("pcm_s16le", None),
+    "flac": ("flac", None),
+    "opus": ("libopus", "96k"),
+    "ogg": ("libvorbis", "160k"),
+    "ipod": ("aac", "192k"),
+    "adts": ("aac", "192k"),
+}
+# 写入管道（不可回写）时需要的额外参数：mp4 类封装改成分片写出，moov 放在开头
+_PIPE_ARGS = {"ipod": ["-movflags", "frag_keyframe+empty_moov"]}
+# 只能写文件的封装：文件头里的长度要在写完后回填，写入管道会得到错误的头
+_SEEKABLE_ONLY = {"wav"}
+
+
+class OutputTarget:
+    """一个输出目标：路径 + 封装格式 + 编码器 + 码率，未指定的按扩展名取默认值"""
+
+    def __init__(self, path=None, codec=None, bitrate=None, format=None):
+        ext = os.path.splitext(path)[1].lower() if path else ""
+        self.path = path
+        self.format = format or _EXT_FORMATS.get(ext, "mp3")
+        default_codec, default_bitrate = _FORMAT_CODECS.get(
+            self.format, _FORMAT_CODECS["mp3"]
+        )
+        self.codec = codec or default_codec
+        if bitrate is None and self.codec == default_codec:
+            bitrate = default_bitrate
+        self.bitrate = bitrate
+
+    def args(self, destination=None):
+        """该目标对应的 ffmpeg 输出参数；destination 默认为 path
+
+        destination 为管道（pipe:N）时，m4a 改为分片 mp4 写出；
+        wav 的文件头需要回填长度，不能写入管道，抛出 ValueError。
+        """
+        destination = destination or self.path
+        args = ["-c:a", self.codec]
+        if self.bitrate:
+            args += ["-b:a", self.bitrate]
+        if destination.startswith("pipe:"):
+            if self.format in _SEEKABLE_ONLY:
+                raise ValueError(f"{self.format} 不能写入管道，请输出到文件或改用 flac")
+            args += _PIPE_ARGS.get(self.format, [])
+        return args + ["-f", self.format, "-y", destination]
+
+
+def _targets(outputs):
+    """把 路径 / OutputTarget / 二者的列表 统一为 OutputTarget 列表"""
+    if isinstance(outputs, (str, OutputTarget)):
+        outputs = [outputs]
+    return [t if isinstance(t, OutputTarget) else OutputTarget(t) for t in outputs]
+
+
+def _output_args(targets):
+    """多个输出写在同一条 ffmpeg 命令里：输入只解码、拼接一次，再分别编码"""
+    args = []
+    for t in targets:
+        args += t.args()
+    return args
+
+
+def _concat_list(audio_files):
+    """生成 concat 分离器的文件列表内容"""
+    lines = []
+    for p in audio_files:
+        p = p.replace("\\", "/").replace("'", "'\\''")
+        lines.append(f"file '{p}'\n")
+    return "".join(lines)
 
 
 class AudioConcatenator:
-    def __init__(self):
+    def __init__(self, clip_cache=None, max_concurrency=None):
+        """clip_cache: 解码结果缓存（如 core.shared_cache.SharedClipCache），按音频路径索引
+        max_concurrency: 异步接口同时运行的 ffmpeg 进程上限，默认 CPU 核数
+        """
         self.ffmpeg = get_ffmpeg_path()
+        self.clip_cache = clip_cache
+        self.max_concurrency = max_concurrency or os.cpu_count() or 4
+        self._semaphores = weakref.WeakKeyDictionary()  # 事件循环 → Semaphore
+
+    def concat(
+        self,
+        audio_files: list,
+        outputs,
+        on_progress=None,
+        cancel_event=None,
+        duration=None,
+    ):
+        """拼接音频；on_progress(percent, eta) / cancel_event 透传给 run_ffmpeg
 
-    def concat(self, audio_files: list, output_file: str):
+        outputs 可以是输出路径、OutputTarget，或它们的列表；
+        多个输出由同一个 ffmpeg 进程生成，只解码、拼接一次。
+        duration 为输出总时长（秒），用于计算百分比；concat 分离器不会报告总时长，
+        不传时进度回调只在结束时给出 100%（可用 AudioLibrary.total_duration 汇总）。
+        """
         temp = TempDir()
 
         try:
             list_file = temp.file("files.txt")
             with open(list_file, "w", encoding="utf-8") as f:
-                for p in audio_files:
-                    p = p.replace("\\", "/").replace("'", "'\\''")
-                    f.write(f"file '{p}'\n")
+                f.write(_concat_list(audio_files))
 
             cmd = [
                 self.ffmpeg,
@@ -26,15 +132,160 @@ class AudioConcatenator:
                 "0",
                 "-i",
                 list_file,
-                "-c:a",
-                "libmp3lame",
-                "-b:a",
-                "192k",
-                "-y",
-                output_file,
-            ]
+            ] + _output_args(_targets(outputs))
+
+            run_ffmpeg(
+                cmd,
+                duration=duration,
+                on_progress=on_progress,
+                cancel_event=cancel_event,
+            )
+
+        finally:
+            temp.cleanup()
+
+    def render(self, audio_files: list, output=None, target=None):
+        """不经过临时文件的拼接：文件列表走 stdin，编码结果走 stdout
+
+        output 为 None 时返回编码后的 bytes；否则写入 output（文件对象 / socket）。
+        target 为 OutputTarget，指定格式 / 编码器 / 码率，默认 mp3 192k。
+        audio_files 需为绝对路径（AudioLibrary.random_audio 返回的就是绝对路径）。
+        """
+        target = target or OutputTarget(format="mp3")
+        return pipe_ffmpeg(
+            self._render_cmd(target.args("pipe:1")),
+            input_data=_concat_list(audio_files).encode("utf-8"),
+            output=output,
+        )
 
+    def encode(self, pcm_data, output=None, target=None):
+        """把内存中的 PCM（格式见 core.pcm）编码，output / target 用法同 render()"""
+        target = target or OutputTarget(format="mp3")
+        cmd = [self.ffmpeg] + pcm.FFMPEG_FORMAT + ["-i", "pipe:0"]
+        return pipe_ffmpeg(
+            cmd + target.args("pipe:1"), input_data=pcm_data, output=output
+        )
+
+    def encode_files(self, pcm_data, outputs):
+        """把同一段 PCM 一次性编码成多个文件，outputs 用法同 concat()"""
+        cmd = [self.ffmpeg] + pcm.FFMPEG_FORMAT + ["-i", "pipe:0"]
+        pipe_ffmpeg(cmd + _output_args(_targets(outputs)), input_data=pcm_data)
+
+    def _render_cmd(self, output_args):
+        return [
+            self.ffmpeg,
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-protocol_whitelist",
+            "file,pipe",
+            "-i",
+            "pipe:0",
+        ] + output_args
+
+    # -------------- asyncio 接口 --------------
+    @property
+    def semaphore(self):
+        """限制异步 ffmpeg 并发数；每个事件循环各自一个，需在协程内访问
+
+        Semaphore 绑定创建时的事件循环，同一个实例先后用于多次 asyncio.run() 时
+        不能共用；循环关闭回收后对应的 Semaphore 随之释放。
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def render_async(self, audio_files: list, outputs=None, target=None):
+        """render() 的 asyncio 版本
+
+        outputs 为 None 时按 target（默认 mp3）返回 bytes；否则写入文件，用法同 concat()。
+        """
+        if outputs is None:
+            output_args = (target or OutputTarget(format="mp3")).args("pipe:1")
+        else:
+            output_args = _output_args(_targets(outputs))
+        data = await run_ffmpeg_async(
+            self._render_cmd(output_args),
+            input_data=_concat_list(audio_files).encode("utf-8"),
+            semaphore=self.semaphore,
+        )
+        return data if outputs is None else None
+
+    async def decode_async(self, audio_file):
+        """decode() 的 asyncio 版本"""
+        cache = self.clip_cache
+        if cache is not None:
+            data = cache.read(audio_file)
+            if data is not None:
+                return data
+
+        cmd = [self.ffmpeg, "-v", "error", "-i", audio_file] + pcm.FFMPEG_FORMAT
+        data = await run_ffmpeg_async(cmd + ["pipe:1"], semaphore=self.semaphore)
+        if cache is not None and cache.owner:
+            cache.put(audio_file, data)
+        return data
+
+    def decode_many(self, audio_files, batch_size=64):
+        """把多个音频解码为统一格式的 PCM，返回 {路径: PCM}；重复的路径只解码一次
+
+        先查 clip_cache，未命中的每 batch_size 个由同一个 ffmpeg 进程解码
+        （多个输入各自输出到临时文件），不再为每个片段各启动一次 ffmpeg。
+        """
+        cache = self.clip_cache
+        decoded = {}
+        pending = []
+        for path in dict.fromkeys(audio_files):
+            data = cache.read(path) if cache is not None else None
+            if data is None:
+                pending.append(path)
+            else:
+                decoded[path] = data
+
+        for i in range(0, len(pending), batch_size):
+            decoded.update(self._decode_batch(pending[i : i + batch_size]))
+        return decoded
+
+    def _decode_batch(self, audio_files):
+        temp = TempDir()
+
+        try:
+            cmd = [self.ffmpeg, "-v", "error"]
+            for path in audio_files:
+                cmd += ["-i", path]
+            pcm_files = [temp.file(f"{i}.pcm") for i in range(len(audio_files))]
+            for i, pcm_file in enumerate(pcm_files):
+                cmd += ["-map", f"{i}:a:0"] + pcm.FFMPEG_FORMAT + ["-y", pcm_file]
             run_ffmpeg(cmd)
 
+            cache = self.clip_cache
+            decoded = {}
+            for path, pcm_file in zip(audio_files, pcm_files):
+                with open(pcm_file, "rb") as f:
+                    data = decoded[path] = f.read()
+                if cache is not None and cache.owner:
+                    cache.put(path, data)
+            return decoded
+
         finally:
             temp.cleanup()
+
+    def decode(self, audio_file):
+        """把单个音频解码为统一格式的 PCM（见 core.pcm）
+
+        设置了 clip_cache 时先查缓存，命中时返回从共享内存拷贝一次得到的 bytearray；
+        未命中则解码（返回 bytes），缓存可写（创建者进程）时顺便写入。
+        """
+        cache = self.clip_cache
+        if cache is not None:
+            data = cache.read(audio_file)
+            if data is not None:
+                return data
+
+        cmd = [self.ffmpeg, "-v", "error", "-i", audio_file] + pcm.FFMPEG_FORMAT
+        data = pipe_ffmpeg(cmd + ["pipe:1"])
+        if cache is not None and cache.owner:
+            cache.put(audio_file, data)
+        return data
@@ -1,34 +1,212 @@
-# core/audio_library.py
 import os
+import json
 import random
+import asyncio
+from types import MappingProxyType
+from .ffmpeg_utils import FFmpegCancelled, probe_duration
+from .mp3_header import mp3_duration
+from .transcode import AUDIO_EXTS, transcode_to_mp3
+
+META_FILE = ".durations.json"  # 每个主播文件夹下的时长元数据
+CACHE_DIR = ".cache"  # 每个主播文件夹下的按需转码缓存
+
+
+def iter_subdirs(path):
+    """遍历 path 下的子文件夹名（跳过 . 开头的隐藏文件夹，如转码缓存）
+
+    用 os.scandir 的 DirEntry 自带的类型信息判断是否为文件夹，
+    不像 listdir + isdir 那样每个条目再多一次 stat。
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.name.startswith(".") and entry.is_dir():
+                yield entry.name
+
+
+def list_audio(char_dir, exts=(".mp3",)):
+    """列出单字文件夹里指定扩展名的音频文件名"""
+    with os.scandir(char_dir) as it:
+        return [
+            entry.name
+            for entry in it
+            if entry.name.lower().endswith(exts) and entry.is_file()
+        ]
 
 
 class AudioLibrary:
-    """管理 字符 → 音频文件 映射"""
+    """管理 字符 → 音频文件 映射
+
+    map 是只读快照：load() 在新字典里构建完成后整体替换，不会原地修改，
+    后台渲染线程无需加锁即可读取，刷新期间也不会看到空的或只建了一半的映射。
+    """
 
     def __init__(self, voice_dir, speaker):
         self.voice_dir = voice_dir
         self.speaker = speaker
-        self.map = {}
+        self.map = MappingProxyType({})
+        self.meta = {}  # 相对路径 → [mtime, size, 时长秒]
+        self._meta_dirty = False
 
-    def load(self):
-        self.map.clear()
+    def load(self, chars=None):
+        """加载字库；传入 chars 时只读取这些字的文件夹，不遍历整个主播目录"""
+        new_map = {}
         base = os.path.join(self.voice_dir, self.speaker)
 
-        for char in os.listdir(base):
-            char_dir = os.path.join(base, char)
-            if not os.path.isdir(char_dir):
+        if chars is None:
+            chars = iter_subdirs(base)
+        else:
+            chars = [c for c in set(chars) if c.strip() and not c.startswith(".")]
+
+        # 所有支持的格式都算可用，非 mp3 第一次被选中时才转码
+        for char in chars:
+            try:
+                files = list_audio(os.path.join(base, char), AUDIO_EXTS)
+            except (FileNotFoundError, NotADirectoryError):
                 continue
+            if files:
+                new_map[char] = tuple(files)
+
+        self.map = MappingProxyType(new_map)  # 原子替换快照
+        self.load_meta()
+
+    async def load_async(self):
+        """load() 的 asyncio 版本
+
+        目录遍历没有原生的异步系统调用，放到默认线程池执行，不阻塞事件循环。
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.load)
+
+    def load_meta(self):
+        try:
+            with open(self._meta_path(), encoding="utf-8") as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = {}
+        self._meta_dirty = False
+
+    def save_meta(self):
+        """把新探测到的时长写回元数据文件"""
+        if not self._meta_dirty:
+            return
+        try:
+            meta = dict(self.meta)  # 其他线程可能正在写入新时长
+            with open(self._meta_path(), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            self._meta_dirty = False
+        except OSError:
+            pass
 
-            mp3s = [f for f in os.listdir(char_dir) if f.lower().endswith(".mp3")]
-            if mp3s:
-                self.map[char] = mp3s
+    def _meta_path(self):
+        return os.path.join(self.voice_dir, self.speaker, META_FILE)
+
+    def duration(self, path, probe=True):
+        """音频时长（秒），结果记入元数据
+
+        优先读元数据；文件变化或未记录时，mp3 直接解析文件头（不启动进程），
+        其他格式或解析失败时才用 ffprobe。
+        probe=False 时不启动 ffprobe，得不到时长返回 None。
+        """
+        base = os.path.join(self.voice_dir, self.speaker)
+        key = os.path.relpath(path, base).replace("\\", "/")
+        st = os.stat(path)
+        record = self.meta.get(key)
+        if record and record[0] == st.st_mtime and record[1] == st.st_size:
+            return record[2]
+        seconds = mp3_duration(path) if path.lower().endswith(".mp3") else None
+        if seconds is None:
+            if not probe:
+                return None
+            seconds = probe_duration(path)
+        self.meta[key] = [st.st_mtime, st.st_size, seconds]
+        self._meta_dirty = True
+        return seconds
+
+    def total_duration(self, paths):
+        """总时长，不启动 ffprobe（见 duration）；有任一片段得不到时长时返回 None"""
+        total = 0.0
+        for path in paths:
+            seconds = self.duration(path, probe=False)
+            if seconds is None:
+                return None
+            total += seconds
+        return total
+
+    def snapshot(self):
+        """当前字库快照（只读映射），一次渲染内应始终使用同一个快照"""
+        return self.map
 
     def has_char(self, char):
         return char in self.map
 
-    def random_audio(self, char):
-        filename = random.choice(self.map[char])
-        return os.path.abspath(
+    def select(self, text, on_progress=None, cancel_event=None):
+        """为文本中每个可用字符随机挑选音频，返回 [(字符, 音频路径), ...]
+
+        选中的非 mp3 会在这里转码，应在后台线程调用；
+        on_progress(已完成, 总数)，cancel_event 置位后抛出 FFmpegCancelled。
+        """
+        snapshot = self.map
+        picks = [
+            (c, random.choice(snapshot[c])) for c in text if c.strip() and c in snapshot
+        ]
+        selection = []
+        for i, (char, filename) in enumerate(picks, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise FFmpegCancelled("已取消")
+            selection.append((char, self.clip_path(char, filename, cancel_event)))
+            if on_progress is not None:
+                on_progress(i, len(picks))
+        return selection
+
+    def random_audio(self, char, snapshot=None):
+        """随机挑一条音频；snapshot 为 snapshot() 的结果，判断有无该字时应使用同一个快照"""
+        if snapshot is None:
+            snapshot = self.map
+        filename = random.choice(snapshot[char])
+        return self.clip_path(char, filename)
+
+    def clip_path(self, char, filename, cancel_event=None):
+        """返回可直接拼接的 mp3 绝对路径；非 mp3 按需转码到缓存，之后复用"""
+        src = os.path.abspath(
             os.path.join(self.voice_dir, self.speaker, char, filename)
         )
+        if filename.lower().endswith(".mp3"):
+            return src
+
+        cached = os.path.abspath(
+            os.path.join(
+                self.voice_dir, self.speaker, CACHE_DIR, char, filename + ".mp3"
+            )
+        )
+        try:
+            fresh = os.stat(cached).st_mtime >= os.stat(src).st_mtime
+        except OSError:
+            fresh = False
+        if not fresh:
+            transcode_to_mp3(src, cached, cancel_event=cancel_event)
+            self.duration(cached, probe=False)  # 顺便记下时长，之后渲染的进度条直接可用
+        return cached
+
+    def warm_up(self, on_progress=None, cancel_event=None):
+        """后台预热：把所有非 mp3 提前转码进缓存；on_progress(已完成, 总数)
+
+        单个文件转码失败不会中断预热，返回失败列表 [(字符, 文件名, 原因), ...]。
+        """
+        pending = [
+            (char, f)
+            for char, files in self.snapshot().items()
+            for f in files
+            if not f.lower().endswith(".mp3")
+        ]
+        failures = []
+        for i, (char, filename) in enumerate(pending, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            try:
+                self.clip_path(char, filename, cancel_event)
+            except FFmpegCancelled:
+                break
+            except Exception as e:
+                failures.append((char, filename, str(e)))
+            if on_progress is not None:
+                on_progress(i, len(pending))
+        return failures
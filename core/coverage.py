@@ -0,0 +1,137 @@
+"""语料覆盖率分析：统计大语料的字频，对照主播字库给出缺字排名和覆盖率
+
+    python -m core.coverage 语料.txt [更多文件...] --speaker 小李 --speaker 小王
+
+语料按块流式读取，字频用 Counter 在 C 层批量累加，内存只与块大小和不同字符数有关，
+几百 MB 的语料也不会整体读入内存。
+"""
+import os
+import sys
+import json
+import argparse
+import unicodedata
+from collections import Counter
+from .audio_library import AudioLibrary, iter_subdirs
+
+
+def count_chars(paths, chunk_size=1 << 20, encoding="utf-8", skip_punct=False):
+    """流式统计一个或多个文本文件的字频（不含空白）"""
+    if isinstance(paths, str):
+        paths = [paths]
+
+    counts = Counter()
+    for path in paths:
+        with open(path, encoding=encoding, errors="ignore") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                counts.update(chunk)
+
+    for c in list(counts):
+        if not c.strip() or (skip_punct and unicodedata.category(c).startswith("P")):
+            del counts[c]
+    return counts
+
+
+def speaker_chars(voice_dir, speaker):
+    """主播字库中有音频的字"""
+    lib = AudioLibrary(voice_dir, speaker)
+    lib.load()
+    return set(lib.map)
+
+
+def analyze(counts, speakers):
+    """counts 为字频，speakers 为 {主播: 字集合}
+
+    返回每个主播的覆盖率和按影响排序的缺字，以及所有主播合并后的缺字排名；
+    影响 = 该字在语料中的出现次数占比，即补录这个字能多覆盖的语料比例。
+    """
+    total = sum(counts.values())
+    report = {"total_chars": total, "distinct_chars": len(counts), "speakers": {}}
+    combined = Counter()
+
+    for name, chars in speakers.items():
+        missing = [(c, n) for c, n in counts.most_common() if c not in chars]
+        missing_total = sum(n for _, n in missing)
+        report["speakers"][name] = {
+            "coverage": (total - missing_total) / total * 100 if total else 100.0,
+            "distinct_coverage": (
+                (len(counts) - len(missing)) / len(counts) * 100 if counts else 100.0
+            ),
+            "missing": [
+                {"char": c, "count": n, "impact": n / total * 100} for c, n in missing
+            ],
+        }
+        for c, n in missing:
+            combined[c] += n  # 缺的主播越多，权重越高
+
+    report["missing"] = [
+        {
+            "char": c,
+            "count": counts[c],
+            "speakers_missing": weight // counts[c],
+            "impact": weight / total * 100,
+        }
+        for c, weight in combined.most_common()
+    ]
+    return report
+
+
+def format_report(report, top=30):
+    lines = [
+        f"语料总字数: {report['total_chars']}，不同字符: {report['distinct_chars']}",
+        "",
+    ]
+    for name, info in report["speakers"].items():
+        lines.append(
+            f"[{name}] 覆盖率 {info['coverage']:.2f}%（按出现次数），"
+            f"{info['distinct_coverage']:.2f}%（按字种），缺 {len(info['missing'])} 字"
+        )
+        for item in info["missing"][:top]:
+            lines.append(
+                f"    {item['char']}  出现 {item['count']} 次  影响 {item['impact']:.3f}%"
+            )
+        lines.append("")
+
+    if len(report["speakers"]) > 1:
+        lines.append("合并缺字排名（出现次数 × 缺该字的主播数）：")
+        for item in report["missing"][:top]:
+            lines.append(
+                f"    {item['char']}  出现 {item['count']} 次  "
+                f"{item['speakers_missing']} 个主播缺  影响 {item['impact']:.3f}%"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分析语料对主播字库的覆盖率")
+    parser.add_argument("corpus", nargs="+", help="语料文本文件")
+    parser.add_argument("--voice-dir", default="voice")
+    parser.add_argument(
+        "--speaker", action="append", help="要分析的主播，可多次指定；默认全部"
+    )
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--skip-punct", action="store_true", help="忽略标点符号")
+    parser.add_argument("--top", type=int, default=30, help="每个主播显示的缺字数")
+    parser.add_argument("--json", help="把完整结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    names = args.speaker or sorted(iter_subdirs(args.voice_dir))
+    for name in names:
+        if not os.path.isdir(os.path.join(args.voice_dir, name)):
+            parser.error(f"主播不存在：{name}")
+
+    counts = count_chars(
+        args.corpus, encoding=args.encoding, skip_punct=args.skip_punct
+    )
+    report = analyze(counts, {n: speaker_chars(args.voice_dir, n) for n in names})
+    print(format_report(report, args.top))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,15 @@
-# core/ffmpeg_utils.py
 import os
+import re
 import sys
+import time
+import asyncio
+import threading
 import subprocess
+from functools import lru_cache
+
+
+class FFmpegCancelled(Exception):
+    """ffmpeg 被主动取消"""
 
 
 def get_ffmpeg_path():
@@ -11,19 +19,278 @@ def get_ffmpeg_path():
     return "ffmpeg"
 
 
-def run_ffmpeg(cmd: list):
-    """统一执行 ffmpeg，隐藏窗口"""
+def get_ffprobe_path():
+    """自动获取 ffprobe 路径（开发 / PyInstaller）"""
+    if hasattr(sys, "_MEIPASS"):
+        return os.path.join(sys._MEIPASS, "ffprobe.exe")
+    return "ffprobe"
+
+
+def _startupinfo():
+    """Windows 下隐藏控制台窗口"""
     startupinfo = None
     if sys.platform == "win32":
         startupinfo = subprocess.STARTUPINFO()
         startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
         startupinfo.wShowWindow = subprocess.SW_HIDE
+    return startupinfo
+
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def _parse_duration(line):
+    """从 ffmpeg 日志行中解析 Duration: HH:MM:SS.xx"""
+    m = _DURATION_RE.search(line)
+    if not m:
+        return None
+    h, mi, s = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(s)
+
+
+def run_ffmpeg(
+    cmd: list, duration=None, on_progress=None, cancel_event=None, timeout=None
+):
+    """统一执行 ffmpeg，隐藏窗口
+
+    duration:     输出总时长（秒），不传则尝试从 ffmpeg 日志里读取输入时长
+    on_progress:  回调 on_progress(percent, eta)，percent 为 0~100，eta 为剩余秒数或 None
+    cancel_event: threading.Event，置位后终止 ffmpeg 并抛出 FFmpegCancelled
+    timeout:      超时秒数，超时后终止 ffmpeg 并抛出 subprocess.TimeoutExpired
+    """
+    if on_progress is None and cancel_event is None:
+        subprocess.run(
+            cmd,
+            startupinfo=_startupinfo(),
+            check=True,
+            capture_output=True,
+            encoding="utf-8",
+            errors="ignore",
+            timeout=timeout,
+        )
+        return
+
+    # 进度信息写到 stdout，日志仍走 stderr
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+    proc = subprocess.Popen(
+        cmd,
+        startupinfo=_startupinfo(),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        errors="ignore",
+    )
+
+    state = {"duration": duration, "cancelled": False, "timed_out": False}
+    stderr_lines = []
+
+    def read_stderr():
+        for line in proc.stderr:
+            stderr_lines.append(line)
+            if state["duration"] is None:
+                state["duration"] = _parse_duration(line)
+
+    def watch():
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while proc.poll() is None:
+            if cancel_event is not None and cancel_event.wait(0.1):
+                state["cancelled"] = True
+            elif cancel_event is None:
+                time.sleep(0.1)
+            if deadline is not None and time.monotonic() > deadline:
+                state["timed_out"] = True
+            if state["cancelled"] or state["timed_out"]:
+                proc.terminate()
+                return
+
+    threads = [
+        threading.Thread(target=read_stderr, daemon=True),
+        threading.Thread(target=watch, daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    started = time.monotonic()
+    info = {}
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        info[key] = value
+        if key != "progress" or on_progress is None:
+            continue
+
+        total = state["duration"]
+        if value == "end":
+            on_progress(100.0, 0.0)
+        elif total:
+            out_time = _progress_seconds(info)
+            percent = max(0.0, min(100.0, out_time / total * 100))
+            on_progress(percent, _estimate_eta(info, out_time, total, started))
+        info = {}
+
+    proc.wait()
+    for t in threads:
+        t.join()
+
+    if state["cancelled"]:
+        raise FFmpegCancelled("已取消")
+    if state["timed_out"]:
+        raise subprocess.TimeoutExpired(cmd, timeout, stderr="".join(stderr_lines))
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode, cmd, stderr="".join(stderr_lines)
+        )
 
-    subprocess.run(
+
+def pipe_ffmpeg(cmd: list, input_data=None, output=None, chunk_size=65536):
+    """通过管道执行 ffmpeg，不落地任何文件
+
+    input_data: 写入 ffmpeg stdin 的 bytes（对应 -i pipe:0）
+    output:     None 时返回 stdout 全部内容（bytes）；
+                否则边读边写入 output，支持 write()（文件对象）或 sendall()（socket）
+    """
+    proc = subprocess.Popen(
         cmd,
-        startupinfo=startupinfo,
+        startupinfo=_startupinfo(),
+        stdin=subprocess.PIPE if input_data is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    stderr_chunks = []
+
+    def feed_stdin():
+        try:
+            proc.stdin.write(input_data)
+        except (BrokenPipeError, OSError):
+            pass  # ffmpeg 提前退出，错误信息看 stderr
+        finally:
+            proc.stdin.close()
+
+    threads = [
+        threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()))
+    ]
+    if input_data is not None:
+        threads.append(threading.Thread(target=feed_stdin))
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    if output is None:
+        chunks = []
+        write = chunks.append
+    else:
+        write = getattr(output, "write", None) or output.sendall
+
+    try:
+        while True:
+            chunk = proc.stdout.read1(chunk_size)
+            if not chunk:
+                break
+            write(chunk)
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.wait()
+        for t in threads:
+            t.join()
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode,
+            cmd,
+            stderr=b"".join(stderr_chunks).decode("utf-8", errors="ignore"),
+        )
+    if output is None:
+        return b"".join(chunks)
+
+
+async def _communicate(cmd, input_data):
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        startupinfo=_startupinfo(),
+        stdin=subprocess.PIPE if input_data is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        out, err = await proc.communicate(input_data)
+    except asyncio.CancelledError:
+        # 任务被取消时不留下孤儿 ffmpeg 进程
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode, cmd, stderr=err.decode("utf-8", errors="ignore")
+        )
+    return out
+
+
+async def run_ffmpeg_async(cmd: list, input_data=None, semaphore=None):
+    """run_ffmpeg / pipe_ffmpeg 的 asyncio 版本，返回 stdout 内容
+
+    semaphore: asyncio.Semaphore，限制同时运行的 ffmpeg 进程数
+    """
+    if semaphore is None:
+        return await _communicate(cmd, input_data)
+    async with semaphore:
+        return await _communicate(cmd, input_data)
+
+
+def _progress_seconds(info):
+    """-progress 中的 out_time_us / out_time_ms 实际单位都是微秒"""
+    for key in ("out_time_us", "out_time_ms"):
+        value = info.get(key, "")
+        if value.isdigit():
+            return int(value) / 1_000_000
+    return 0.0
+
+
+def _estimate_eta(info, out_time, total, started):
+    """根据 speed（倍速）估算剩余时间，没有 speed 时按实际耗时推算"""
+    remaining = max(0.0, total - out_time)
+    speed = info.get("speed", "").rstrip("x").strip()
+    try:
+        speed = float(speed)
+    except ValueError:
+        speed = 0.0
+    if speed > 0:
+        return remaining / speed
+
+    elapsed = time.monotonic() - started
+    if out_time > 0 and elapsed > 0:
+        return remaining * elapsed / out_time
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _probe_duration(path, mtime, size):
+    out = subprocess.run(
+        [
+            get_ffprobe_path(),
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ],
+        startupinfo=_startupinfo(),
         check=True,
         capture_output=True,
         encoding="utf-8",
         errors="ignore",
-    )
+    ).stdout.strip()
+    try:
+        return float(out)
+    except ValueError:
+        return 0.0
+
+
+def probe_duration(path):
+    """用 ffprobe 读取音频时长（秒），按 路径+修改时间+大小 缓存"""
+    st = os.stat(path)
+    return _probe_duration(os.path.abspath(path), st.st_mtime, st.st_size)
@@ -0,0 +1,90 @@
+"""从 mp3 文件头读取时长，不启动 ffprobe
+
+LAME（包括 ffmpeg 的 libmp3lame）写出的文件在第一帧里带 Xing / Info 头，记录了总帧数，
+由此可以直接算出准确时长；没有这类头时按第一帧的码率估算（CBR 准确，VBR 近似）。
+只读取文件开头几 KB，适合在渲染前为上千个片段汇总时长。
+"""
+import os
+import struct
+
+_HEAD_BYTES = 16 * 1024  # 读取文件开头的字节数，足够跳过常见的 ID3v2 标签并找到第一帧
+
+# MPEG 版本位 → (采样率表, Layer III 码率表 kbps, 每帧采样数)
+_MPEG1 = (
+    (44100, 48000, 32000),
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    1152,
+)
+_MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+_VERSIONS = {
+    3: _MPEG1,
+    2: ((22050, 24000, 16000), _MPEG2_BITRATES, 576),  # MPEG-2
+    0: ((11025, 12000, 8000), _MPEG2_BITRATES, 576),  # MPEG-2.5
+}
+# (每帧采样数, 声道数) → 边信息长度，Xing / Info 头紧随其后
+_SIDE_INFO = {(1152, 2): 32, (1152, 1): 17, (576, 2): 17, (576, 1): 9}
+
+
+def _skip_id3(head):
+    """ID3v2 标签的长度（没有则为 0）"""
+    if head[:3] != b"ID3" or len(head) < 10:
+        return 0
+    size = 0
+    for b in head[6:10]:
+        size = (size << 7) | (b & 0x7F)  # synchsafe 整数
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_frame(head, pos):
+    """解析 pos 处的 Layer III 帧头，返回 (采样率, 码率 kbps, 每帧采样数, 声道数)"""
+    b1, b2, b3 = head[pos + 1], head[pos + 2], head[pos + 3]
+    if head[pos] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = _VERSIONS.get((b1 >> 3) & 3)
+    if version is None or (b1 >> 1) & 3 != 1:  # 只支持 Layer III
+        return None
+    rates, bitrates, samples = version
+    bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+    if bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    channels = 1 if b3 >> 6 == 3 else 2
+    return rates[rate_idx], bitrates[bitrate_idx], samples, channels
+
+
+def mp3_duration(path):
+    """mp3 时长（秒）；不是 mp3 或无法解析时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_HEAD_BYTES)
+        file_size = os.path.getsize(path)
+    except OSError:
+        return None
+
+    start = _skip_id3(head)
+    if start >= len(head):
+        return None
+    # 找第一帧：帧同步字之后帧头合法
+    for pos in range(start, len(head) - 4):
+        frame = _parse_frame(head, pos)
+        if frame is not None:
+            break
+    else:
+        return None
+    rate, bitrate, samples, channels = frame
+
+    # 帧数记录在 Xing / Info 头（边信息之后）或 VBRI 头（帧头后 32 字节）里
+    xing = pos + 4 + _SIDE_INFO[samples, channels]
+    if head[xing : xing + 4] in (b"Xing", b"Info") and len(head) >= xing + 12:
+        (flags,) = struct.unpack_from(">I", head, xing + 4)
+        if flags & 1:
+            (frames,) = struct.unpack_from(">I", head, xing + 8)
+            return frames * samples / rate
+    vbri = pos + 4 + 32
+    if head[vbri : vbri + 4] == b"VBRI" and len(head) >= vbri + 18:
+        (frames,) = struct.unpack_from(">I", head, vbri + 14)
+        return frames * samples / rate
+
+    # 没有帧数信息：按码率估算（CBR）
+    audio_bytes = file_size - pos
+    return audio_bytes * 8 / (bitrate * 1000)
@@ -0,0 +1,20 @@
+"""内存中 PCM 音频的统一格式：16bit 有符号小端、单声道、44.1kHz"""
+
+SAMPLE_RATE = 44100
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # 字节
+BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+
+# ffmpeg 输入 / 输出 raw PCM 时使用的参数
+FFMPEG_FORMAT = ["-f", "s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE)]
+
+
+def duration(pcm):
+    """PCM 时长（秒）"""
+    return len(pcm) / BYTES_PER_SECOND
+
+
+def silence(seconds):
+    """生成指定时长的静音"""
+    frames = int(seconds * SAMPLE_RATE)
+    return b"\x00" * (frames * CHANNELS * SAMPLE_WIDTH)
@@ -0,0 +1,113 @@
+"""高频短语记忆：把经常出现的 n 字短语用过的音频组合缓存起来，整段复用
+
+只有出现次数达到 hot_count 的短语才会被缓存，缓存的内容直接取自渲染时已解码的片段，
+不额外解码。每个短语保留最多 variants 种不同的组合（按字保存 PCM 引用，不另存拼接结果），
+收集满之后命中时从中随机挑一种，仍然保留随机选音、避免重复的效果；其余文字照常随机挑选。
+"""
+import random
+from collections import Counter, OrderedDict
+
+
+class PhraseMemo:
+    def __init__(
+        self,
+        max_bytes=64 * 1024 * 1024,
+        min_n=2,
+        max_n=4,
+        hot_count=3,
+        variants=4,
+        max_tracked=100_000,
+    ):
+        self.max_bytes = max_bytes
+        self.min_n = min_n
+        self.max_n = max_n
+        self.hot_count = hot_count
+        self.variants = variants
+        self.max_tracked = max_tracked
+
+        self.counts = Counter()  # (key, 短语) → 出现次数
+        # (key, 短语) → [组合, ...]，组合为逐字 PCM 的元组；按最近使用排序
+        self.segments = OrderedDict()
+        self.size = 0  # 按组合里片段的长度累计；片段被多个组合共用时偏保守
+
+    def observe(self, key, chars):
+        """统计一段连续文字里的 n 字短语；key 用来区分主播"""
+        for n in range(self.min_n, self.max_n + 1):
+            for i in range(len(chars) - n + 1):
+                self.counts[key, chars[i : i + n]] += 1
+
+        if len(self.counts) > self.max_tracked:
+            # 只保留出现次数最多的一半，统计表的内存有上限
+            self.counts = Counter(dict(self.counts.most_common(self.max_tracked // 2)))
+
+    def lookup(self, key, chars, start):
+        """从 start 开始找最长的、组合已收集满的短语，返回 (逐字 PCM 元组, 字数) 或 None"""
+        for n in range(min(self.max_n, len(chars) - start), self.min_n - 1, -1):
+            phrase = (key, chars[start : start + n])
+            variants = self.segments.get(phrase)
+            if variants is not None and len(variants) >= self.variants:
+                self.segments.move_to_end(phrase)
+                return random.choice(variants), n
+        return None
+
+    def remember(self, key, chars, pieces):
+        """记下本次用到的组合；pieces 为 chars 每个字的 PCM（含命中缓存的部分）
+
+        从长到短挑选，同一位置只记最长的热门短语，它的子短语不再单独记一份。
+        """
+        covered = set()  # 已经由更长的短语记下的位置
+        for n in range(self.max_n, self.min_n - 1, -1):
+            for i in range(len(chars) - n + 1):
+                span = range(i, i + n)
+                if any(j in covered for j in span):
+                    continue
+                phrase = (key, chars[i : i + n])
+                if self.counts[phrase] < self.hot_count:
+                    continue
+                self._store(phrase, tuple(pieces[i : i + n]))
+                covered.update(span)
+
+    def _store(self, phrase, variant):
+        variants = self.segments.setdefault(phrase, [])
+        self.segments.move_to_end(phrase)
+        if len(variants) >= self.variants or variant in variants:
+            return  # 已收集满，或已经记过这种组合（如本次就是命中的那一种）
+        size = sum(len(p) for p in variant)
+        if size > self.max_bytes:
+            if not variants:
+                del self.segments[phrase]
+            return
+        variants.append(variant)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, old = self.segments.popitem(last=False)  # 淘汰最久未用的短语
+            self.size -= sum(len(p) for v in old for p in v)
+
+    def plan(self, key, chars, pick):
+        """为一段连续可用的文字逐字给出 PCM 或待解码的音频
+
+        命中缓存的短语逐字给出缓存的 PCM，其余字用 pick(字) 的结果（如随机选中的音频路径）。
+        解码完成后把逐字 PCM 传给 remember()。
+        """
+        self.observe(key, chars)
+
+        pieces = []
+        i = 0
+        while i < len(chars):
+            hit = self.lookup(key, chars, i)
+            if hit is not None:
+                pieces.extend(hit[0])
+                i += hit[1]
+                continue
+            pieces.append(pick(chars[i]))
+            i += 1
+        return pieces
+
+    def render(self, key, chars, render_char):
+        """渲染一段连续可用的文字，返回逐字的 PCM 列表
+
+        render_char(字) 返回该字随机选取并解码后的 PCM；命中缓存的短语整段复用。
+        """
+        pieces = self.plan(key, chars, render_char)
+        self.remember(key, chars, pieces)
+        return pieces
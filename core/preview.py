@@ -0,0 +1,61 @@
+from .audio_concat import AudioConcatenator
+
+
+class PreviewSession:
+    """实时预览：按位置记录选中的音频和解码后的 PCM，编辑时只重新渲染改动的区间"""
+
+    def __init__(self, library, concatenator=None):
+        self.library = library
+        self.concatenator = concatenator or AudioConcatenator()
+        self.text = ""
+        self.clips = []  # 每个位置选中的音频路径，缺字 / 空白为 None
+        self.segments = []  # 每个位置解码后的 PCM
+        self.pcm = b""  # 全部 segments 拼接后的结果
+        self.decoded = {}  # 当前文本用到的 音频路径 → PCM，同一条音频只解码一次
+
+    def _segment(self, clip):
+        if clip is None:
+            return b""
+        if clip not in self.decoded:
+            self.decoded[clip] = self.concatenator.decode(clip)
+        return self.decoded[clip]
+
+    def update(self, text):
+        """更新文本，返回新的完整 PCM；只有 公共前缀 / 后缀 之间的字会重新选取和解码"""
+        old = self.text
+        limit = min(len(old), len(text))
+
+        start = 0
+        while start < limit and old[start] == text[start]:
+            start += 1
+        tail = 0
+        while tail < limit - start and old[-1 - tail] == text[-1 - tail]:
+            tail += 1
+
+        old_end = len(old) - tail
+        new_end = len(text) - tail
+
+        # 判断和选取用同一个快照，期间字库重新加载也不会出现判断有、选取时没有
+        snapshot = self.library.snapshot()
+        clips = []
+        for c in text[start:new_end]:
+            if c.strip() and c in snapshot:
+                clips.append(self.library.random_audio(c, snapshot))
+            else:
+                clips.append(None)
+        segments = [self._segment(clip) for clip in clips]
+
+        # 在已有结果上按字节偏移拼接，前后不变的部分不再重新拼接
+        begin = sum(len(s) for s in self.segments[:start])
+        end = begin + sum(len(s) for s in self.segments[start:old_end])
+        self.pcm = self.pcm[:begin] + b"".join(segments) + self.pcm[end:]
+
+        self.clips[start:old_end] = clips
+        self.segments[start:old_end] = segments
+        self.text = text
+
+        # 只保留当前文本仍在使用的音频，删掉的字不再占用内存
+        live = set(self.clips)
+        for clip in [c for c in self.decoded if c not in live]:
+            del self.decoded[clip]
+        return self.pcm
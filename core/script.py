@@ -0,0 +1,211 @@
+"""多主播脚本：一次选字、一次编码，直接输出整段对话
+
+脚本格式：
+    [小李]你好，今天天气不错<500ms>对吧？
+    [小王]是啊。<1.5s>[小李]那出去走走！
+
+- [主播名] 切换主播，可以放在行首，也可以在行内随时切换；之后的文字都用该主播
+- <500ms> / <1.5s> 插入停顿
+- 换行处自动插入 line_pause 秒停顿
+"""
+
+import os
+import re
+import sys
+import argparse
+from .audio_library import AudioLibrary
+from .audio_concat import AudioConcatenator
+from .phrase_memo import PhraseMemo
+from .alignment import build_alignment, write_alignment
+from . import pcm
+
+_TOKEN_RE = re.compile(r"\[([^\]]+)\]|<\s*(\d+(?:\.\d+)?)\s*(ms|s)\s*>")
+
+
+def parse_script(text, default_speaker=None, line_pause=0.3):
+    """解析脚本，返回事件列表：("char", 主播, 字) / ("pause", 秒)"""
+    events = []
+    speaker = default_speaker
+
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        if events and line_pause > 0:
+            events.append(("pause", line_pause))
+
+        pos = 0
+        for m in _TOKEN_RE.finditer(line):
+            speaker = _add_chars(events, speaker, line[pos : m.start()], lineno)
+            if m.group(1) is not None:
+                speaker = m.group(1).strip()
+            else:
+                value = float(m.group(2))
+                events.append(("pause", value / 1000 if m.group(3) == "ms" else value))
+            pos = m.end()
+        speaker = _add_chars(events, speaker, line[pos:], lineno)
+
+    return events
+
+
+def _add_chars(events, speaker, chunk, lineno):
+    for c in chunk:
+        if not c.strip():
+            continue
+        if speaker is None:
+            raise ValueError(f"第 {lineno} 行：还没有用 [主播名] 指定主播")
+        events.append(("char", speaker, c))
+    return speaker
+
+
+def needed_chars(events):
+    """每个主播需要用到的字：{主播: {字, ...}}"""
+    chars = {}
+    for event in events:
+        if event[0] == "char":
+            chars.setdefault(event[1], set()).add(event[2])
+    return chars
+
+
+class ScriptRenderer:
+    def __init__(self, voice_dir, concatenator=None, memo=None):
+        """memo: core.phrase_memo.PhraseMemo，多次渲染间复用高频短语用过的音频组合
+
+        不传时自带一个；渲染器应长期复用（如服务进程里每个实例渲染多份脚本），
+        高频短语才能积累起来。传 False 关闭。
+        """
+        self.voice_dir = voice_dir
+        self.concatenator = concatenator or AudioConcatenator()
+        self.memo = PhraseMemo() if memo is None else memo or None
+        self.libraries = {}
+        self.loaded_chars = {}  # 主播 → 已加载过的字（含缺字），之后的脚本只补加载新字
+
+    def load(self, events):
+        """只加载脚本用到、之前还没加载过的字，返回缺字 {主播: {字, ...}}"""
+        missing = {}
+        for speaker, chars in needed_chars(events).items():
+            lib = self.libraries.get(speaker)
+            if lib is None:
+                if not os.path.isdir(os.path.join(self.voice_dir, speaker)):
+                    raise ValueError(f"主播不存在：{speaker}")
+                lib = self.libraries[speaker] = AudioLibrary(self.voice_dir, speaker)
+                self.loaded_chars[speaker] = set()
+            loaded = self.loaded_chars[speaker]
+            if not chars <= loaded:
+                loaded |= chars
+                lib.load(loaded)  # 整体替换快照，已加载的字一并保留
+            absent = {c for c in chars if not lib.has_char(c)}
+            if absent:
+                missing[speaker] = absent
+        return missing
+
+    def render(self, events, output=None, target=None, outputs=None, alignment=None):
+        """选字 → 批量解码拼接为 PCM → 一次编码
+
+        output / target 用法同 AudioConcatenator.render()；
+        传入 outputs（用法同 AudioConcatenator.concat()）时从同一段 PCM 写出多个文件。
+        缺字直接跳过；需要提示缺字时先调用 load() 检查返回值。
+        alignment 为时间轴文件路径（.srt / .json）或路径列表，编码完成后一并写出；
+        时长直接取自解码后的 PCM，停顿计入时间但不输出。
+
+        片段统一解码为单声道 44.1kHz（见 core.pcm）后在内存中拼接，立体声或其他采样率的
+        素材会被混缩 / 重采样；需要保留原始声道和采样率时请用 AudioConcatenator.concat()。
+        """
+        self.load(events)
+
+        # 每个主播取一次快照，整次渲染都用它判断和选字，不受并发的重新加载影响
+        snapshots = {s: lib.snapshot() for s, lib in self.libraries.items()}
+
+        def pick(speaker, char):
+            return self.libraries[speaker].random_audio(char, snapshots[speaker])
+
+        # 先为每个字选好音频（或取短语缓存里的 PCM），再一次性批量解码所有选中的路径
+        runs = list(_runs(events, snapshots))
+        plans = []
+        for speaker, run in runs:
+            if speaker is None:
+                plans.append(None)
+            elif self.memo is not None:
+                plans.append(self.memo.plan(speaker, run, lambda c: pick(speaker, c)))
+            else:
+                plans.append([pick(speaker, c) for c in run])
+        decoded = self.concatenator.decode_many(
+            p for plan in plans if plan for p in plan if isinstance(p, str)
+        )
+
+        out = bytearray()
+        items = []  # (字, 时长)，停顿为 (None, 时长)
+        for (speaker, run), plan in zip(runs, plans):
+            if speaker is None:
+                silence = pcm.silence(run)
+                out += silence
+                items.append((None, pcm.duration(silence)))
+                continue
+            pieces = [decoded[p] if isinstance(p, str) else p for p in plan]
+            if self.memo is not None:
+                self.memo.remember(speaker, run, pieces)
+            for char, piece in zip(run, pieces):
+                out += piece
+                items.append((char, pcm.duration(piece)))
+
+        if outputs is not None:
+            result = self.concatenator.encode_files(out, outputs)
+        else:
+            result = self.concatenator.encode(out, output, target)
+        if alignment is not None:
+            timeline = build_alignment(items)
+            for path in [alignment] if isinstance(alignment, str) else alignment:
+                write_alignment(timeline, path)
+        return result
+
+
+def _runs(events, snapshots):
+    """把事件切成 (主播, 连续可用的字) 和 (None, 停顿秒数)；缺字处断开
+
+    snapshots: {主播: AudioLibrary.snapshot()}
+    """
+    speaker, run = None, ""
+    for event in events:
+        if event[0] == "char" and event[2] in snapshots[event[1]]:
+            if event[1] != speaker and run:
+                yield speaker, run
+                run = ""
+            speaker = event[1]
+            run += event[2]
+            continue
+        if run:
+            yield speaker, run
+            speaker, run = None, ""
+        if event[0] == "pause":
+            yield None, event[1]
+    if run:
+        yield speaker, run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="渲染多主播脚本")
+    parser.add_argument("script", help="脚本文件（UTF-8）")
+    parser.add_argument(
+        "output", nargs="+", help="输出文件，可同时给多个（按扩展名决定格式）"
+    )
+    parser.add_argument("--voice-dir", default="voice")
+    parser.add_argument("--speaker", help="脚本开头未指定主播时使用的主播")
+    parser.add_argument("--line-pause", type=float, default=0.3, help="换行停顿（秒）")
+    parser.add_argument(
+        "--alignment",
+        action="append",
+        help="同时导出逐字时间轴（.srt / .json），可重复指定",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.script, encoding="utf-8") as f:
+        events = parse_script(f.read(), args.speaker, args.line_pause)
+
+    renderer = ScriptRenderer(args.voice_dir)
+    for speaker, chars in renderer.load(events).items():
+        print(f"{speaker} 缺少字符：{''.join(sorted(chars))}", file=sys.stderr)
+
+    renderer.render(events, outputs=args.output, alignment=args.alignment)
+
+
+if __name__ == "__main__":
+    main()
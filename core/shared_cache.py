@@ -0,0 +1,252 @@
+"""多进程共享的解码音频缓存
+
+主进程创建缓存并写入（解码）热门音频，渲染子进程按名字挂载后直接读共享内存，
+增加进程数不会让缓存内存成倍增长：
+
+    # 主进程
+    cache = SharedClipCache.create(size=256 * 1024 * 1024)
+    AudioConcatenator(clip_cache=cache).decode(path)   # 未命中时解码并写入缓存
+
+    # 子进程（例如 ProcessPoolExecutor 的 initializer 里）
+    cache = SharedClipCache.attach(name)
+    AudioConcatenator(clip_cache=cache).decode(path)   # 命中时不再解码
+
+内存布局：[索引区大小 | 版本号 | 最旧序号 | 下一个序号][索引记录环][数据区]。
+只有创建者写入，数据区按环形缓冲区分配，空间不足时从最旧的条目开始淘汰（FIFO）。
+索引是定长记录（键的摘要, 偏移, 长度）组成的环，每次写入只追加一条记录；
+淘汰总是从最旧的开始，只需推进"最旧序号"。读取方在本地维护索引，
+每次只读入上次之后新增的记录，不随条目数增长。
+写入期间版本号为奇数（seqlock），读取方据此判断新增记录是否完整、读到的数据是否有效。
+同一进程内的多个线程可以共用一个实例：本地索引的读写都在实例锁内进行。
+"""
+import sys
+import time
+import threading
+import struct
+import hashlib
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+_INDEX_SIZE = struct.Struct("<Q")  # 索引区大小，创建后不变
+_HEADER = struct.Struct("<QQQ")  # 版本号, 最旧条目序号, 下一条记录序号
+_RECORD = struct.Struct("<16sQQ")  # 键的摘要, 数据区偏移, 长度
+_HEADER_OFFSET = _INDEX_SIZE.size
+_INDEX_OFFSET = _HEADER_OFFSET + _HEADER.size
+
+
+def _digest(key):
+    """索引里只存键的 128 位摘要，记录定长"""
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class SharedClipCache:
+    def __init__(self, shm, index_size, owner):
+        self.shm = shm
+        self.name = shm.name
+        self.index_size = index_size
+        self.owner = owner
+        self.slots = index_size // _RECORD.size  # 索引最多容纳的条目数
+        self._data_start = _INDEX_OFFSET + index_size
+        self.capacity = shm.size - self._data_start
+
+        self._version = None if not owner else 0
+        self._index = OrderedDict()  # 摘要 → (offset, length, 序号)，按序号排列
+        self._first = 0  # 最旧条目的序号
+        self._next = 0  # 下一条记录的序号（读取方：已读到的位置）
+        self._head = 0  # 数据区下一次写入的位置（仅创建者使用）
+        # 保护本地索引：创建者的写入 / 读取、挂载方的索引同步都不能与本进程其他线程交错
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, size, index_size=4 * 1024 * 1024, name=None):
+        """创建缓存；size 为共享内存总大小（含索引区）"""
+        if index_size < _RECORD.size:
+            raise ValueError("索引区至少要放下一条记录")
+        if size <= _INDEX_OFFSET + index_size:
+            raise ValueError("size 必须大于索引区大小")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _INDEX_SIZE.pack_into(shm.buf, 0, index_size)
+        _HEADER.pack_into(shm.buf, _HEADER_OFFSET, 0, 0, 0)
+        return cls(shm, index_size, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """在其他进程中按名字挂载只读缓存"""
+        shm = shared_memory.SharedMemory(name=name)
+        index_size = _INDEX_SIZE.unpack_from(shm.buf, 0)[0]
+        if sys.platform != "win32":
+            # 挂载方不负责释放，避免子进程退出时 resource_tracker 把共享内存删掉
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, index_size, owner=False)
+
+    # -------------- 读取 --------------
+    def _read_version(self):
+        return _HEADER.unpack_from(self.shm.buf, _HEADER_OFFSET)[0]
+
+    def _record_offset(self, seq):
+        return _INDEX_OFFSET + (seq % self.slots) * _RECORD.size
+
+    def _sync_index(self):
+        """版本号变化时补读新增记录、丢掉已淘汰的条目，返回当前（偶数）版本号"""
+        if self.owner:
+            return self._version
+        while True:
+            version, first, next_seq = _HEADER.unpack_from(self.shm.buf, _HEADER_OFFSET)
+            if version & 1:
+                time.sleep(0)  # 写入进行中
+                continue
+            if version == self._version:
+                return version
+            records = [
+                (seq, _RECORD.unpack_from(self.shm.buf, self._record_offset(seq)))
+                for seq in range(max(self._next, first), next_seq)
+            ]
+            if self._read_version() != version:
+                continue
+
+            self._drop_before(first)
+            for seq, (digest, offset, length) in records:
+                self._index[digest] = (offset, length, seq)
+                self._index.move_to_end(digest)
+            self._first, self._next = first, next_seq
+            self._version = version
+            return version
+
+    def _drop_before(self, first):
+        """丢掉序号小于 first 的（已淘汰的）条目"""
+        while self._index:
+            digest, entry = next(iter(self._index.items()))
+            if entry[2] >= first:
+                break
+            del self._index[digest]
+
+    def _locate(self, key):
+        entry = self._index.get(_digest(key))
+        if entry is None:
+            return None
+        start = self._data_start + entry[0]
+        return entry, start, start + entry[1]
+
+    def get(self, key):
+        """零拷贝读取，返回 memoryview；未命中返回 None
+
+        视图指向共享内存，条目被创建者淘汰后内容会被覆盖；
+        需要长期持有请用 read()，需要拼接请用 read_into()。
+        """
+        with self._lock:
+            self._sync_index()
+            found = self._locate(key)
+        if found is None:
+            return None
+        _, start, end = found
+        return self.shm.buf[start:end]
+
+    def read(self, key):
+        """读取一份拷贝（bytearray，只拷贝一次），并确认拷贝期间该条目没有被淘汰；
+        未命中返回 None"""
+        out = bytearray()
+        if not self.read_into(key, out):
+            return None
+        return out
+
+    def read_into(self, key, out):
+        """把条目直接从共享内存追加到 bytearray out，不经过中间 bytes
+
+        拷贝后确认期间该条目没有被淘汰，被淘汰则撤回追加的内容并重试；
+        命中返回 True，未命中返回 False（out 不变）。
+        """
+        with self._lock:
+            return self._read_into(key, out)
+
+    def _read_into(self, key, out):
+        while True:
+            version = self._sync_index()
+            found = self._locate(key)
+            if found is None:
+                return False
+            entry, start, end = found
+            size = len(out)
+            with self.shm.buf[start:end] as view:
+                out += view
+            if self._read_version() == version:
+                return True
+            # 期间有写入：条目仍在原位置说明没有被覆盖
+            self._sync_index()
+            if self._locate(key) == found:
+                return True
+            del out[size:]
+
+    def __contains__(self, key):
+        with self._lock:
+            self._sync_index()
+            return _digest(key) in self._index
+
+    def __len__(self):
+        with self._lock:
+            self._sync_index()
+            return len(self._index)
+
+    # -------------- 写入（仅创建者） --------------
+    def put(self, key, data):
+        """写入一条缓存，空间不足时淘汰最旧的条目；数据大于容量时返回 False"""
+        if not self.owner:
+            raise PermissionError("只有创建缓存的进程可以写入")
+        with self._lock:
+            return self._put(_digest(key), data)
+
+    def _put(self, digest, data):
+        if digest in self._index:
+            return True
+        length = len(data)
+        if length > self.capacity:
+            return False
+
+        offset = self._head
+        wrapped = offset + length > self.capacity
+        if wrapped:
+            offset = 0  # 绕回数据区开头，末尾放不下的空间连同其中的条目一起作废
+        end = offset + length
+
+        self._bump_version()
+        while self._index:
+            o, n, seq = next(iter(self._index.values()))
+            stale = wrapped and o >= self._head  # 末尾作废区里的条目
+            full = self._next - seq >= self.slots  # 索引记录环已满
+            if not (stale or full or (o < end and offset < o + n)):
+                break
+            self._index.popitem(last=False)
+        self._first = next(iter(self._index.values()))[2] if self._index else self._next
+
+        start = self._data_start + offset
+        self.shm.buf[start : start + length] = data
+        _RECORD.pack_into(
+            self.shm.buf, self._record_offset(self._next), digest, offset, length
+        )
+        self._index[digest] = (offset, length, self._next)
+        self._next += 1
+        self._head = end
+        self._bump_version()
+        return True
+
+    def _bump_version(self):
+        """版本号加一并发布 最旧 / 下一个 序号；变为奇数表示写入开始，偶数表示完成"""
+        self._version += 1
+        _HEADER.pack_into(
+            self.shm.buf, _HEADER_OFFSET, self._version, self._first, self._next
+        )
+
+    # -------------- 释放 --------------
+    def close(self):
+        """释放共享内存；get() 返回的视图需先释放"""
+        self._index = OrderedDict()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,39 @@
+import os
+import threading
+from .ffmpeg_utils import get_ffmpeg_path, run_ffmpeg
+
+# 音频库支持的格式；非 mp3 会被转成 mp3 再参与拼接
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".ogg", ".flac", ".aac", ".wma")
+
+# 各格式转 mp3 的编码参数
+_MP3_ARGS = {
+    ".wav": ["-q:a", "2"],  # 无损格式，高质量 (2-最高质量, 9-最低质量)
+    ".flac": ["-q:a", "2"],
+    ".m4a": ["-b:a", "192k"],  # AAC格式，保持较好质量
+    ".aac": ["-b:a", "192k"],
+    ".ogg": ["-b:a", "160k"],  # OGG Vorbis格式
+    ".wma": ["-b:a", "128k"],
+}
+_DEFAULT_ARGS = ["-b:a", "128k"]
+
+
+def mp3_cmd(src, dst, ffmpeg=None):
+    """构建把 src 转成 mp3 的 ffmpeg 命令"""
+    ext = os.path.splitext(src)[1].lower()
+    return (
+        [ffmpeg or get_ffmpeg_path(), "-i", str(src), "-codec:a", "libmp3lame"]
+        + _MP3_ARGS.get(ext, _DEFAULT_ARGS)
+        + ["-f", "mp3", "-y", str(dst)]
+    )
+
+
+def transcode_to_mp3(src, dst, cancel_event=None, timeout=30):
+    """转码到 dst；先写临时文件再替换，多个线程同时转同一文件也不会读到半成品"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        run_ffmpeg(mp3_cmd(src, tmp), cancel_event=cancel_event, timeout=timeout)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -1,6 +1,8 @@
 import os
 import sys
+import time
 import random
+import threading
 from pathlib import Path
 import shutil
 from pydub import AudioSegment
@@ -20,11 +22,36 @@ from PyQt5.QtWidgets import (
     QProgressBar,
     QGroupBox,
     QGridLayout,
+    QCheckBox,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QThread,
+    QTimer,
+    QBuffer,
+    QByteArray,
+    QIODevice,
+    pyqtSignal,
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
-from core.audio_library import AudioLibrary
+from PyQt5.QtMultimedia import QAudioFormat, QAudioOutput
+from core.audio_library import AudioLibrary, iter_subdirs, list_audio
 from core.audio_concat import AudioConcatenator
+from core.preview import PreviewSession
+from core.alignment import library_alignment, write_alignment
+from core.transcode import AUDIO_EXTS, mp3_cmd
+from core import pcm
+from core.ffmpeg_utils import run_ffmpeg, FFmpegCancelled
+
+
+def format_eta(seconds):
+    """把剩余秒数格式化为 mm:ss / hh:mm:ss"""
+    seconds = int(max(0, seconds))
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    if h:
+        return f"{h}:{m:02d}:{s:02d}"
+    return f"{m:02d}:{s:02d}"
 
 
 class AudioProcessor(QThread):
@@ -39,9 +66,29 @@ class AudioProcessor(QThread):
         self.voice_dir = voice_dir
         self.speaker = speaker
         self.speaker_path = os.path.join(voice_dir, speaker)
+        self.cancel_event = threading.Event()
+        self.started_at = None
+
+    def cancel(self):
+        """请求取消，正在运行的 ffmpeg 会被终止"""
+        self.cancel_event.set()
+
+    def _report_progress(self, idx, total_folders, i, total_files, percent):
+        """把单个文件的 ffmpeg 进度折算成整体进度，并按已用时间估算剩余时间"""
+        file_frac = (i + percent / 100) / max(total_files, 1)
+        overall = (idx + file_frac) / max(total_folders, 1)
+        self.progress_signal.emit(int(overall * 100))
+
+        elapsed = time.monotonic() - self.started_at
+        if overall > 0:
+            eta = elapsed * (1 - overall) / overall
+            self.status_signal.emit(
+                f"正在整理音频... {overall * 100:.0f}%，剩余约 {format_eta(eta)}"
+            )
 
     def run(self):
         try:
+            self.started_at = time.monotonic()
             self.status_signal.emit("开始整理音频文件...")
 
             # ============ 修改部分：确定ffmpeg路径 ============
@@ -56,11 +103,7 @@ class AudioProcessor(QThread):
             # ============ 修改结束 ============
 
             # 获取所有单字文件夹
-            char_folders = [
-                f
-                for f in os.listdir(self.speaker_path)
-                if os.path.isdir(os.path.join(self.speaker_path, f))
-            ]
+            char_folders = list(iter_subdirs(self.speaker_path))
 
             total_folders = len(char_folders)
 
@@ -69,16 +112,8 @@ class AudioProcessor(QThread):
 
                 # 获取文件夹中所有音频文件
                 audio_files = []
-                for ext in [
-                    '*.mp3',
-                    '*.wav',
-                    '*.m4a',
-                    '*.ogg',
-                    '*.flac',
-                    '*.aac',
-                    '*.wma',
-                ]:
-                    audio_files.extend(Path(folder_path).glob(ext))
+                for ext in AUDIO_EXTS:
+                    audio_files.extend(Path(folder_path).glob('*' + ext))
 
                 # 转换非mp3文件为mp3（使用ffmpeg）
                 for i, audio_file in enumerate(audio_files):
@@ -97,91 +132,28 @@ class AudioProcessor(QThread):
                         temp_output = audio_file.with_suffix('.temp.mp3')
                         output_file = audio_file.with_suffix('.mp3')
 
-                        # 构建ffmpeg转换命令
-                        if file_ext in ['.wav', '.flac']:
-                            # 无损格式，使用高质量转换
-                            cmd = [
-                                ffmpeg_path,
-                                '-i',
-                                str(audio_file),
-                                '-codec:a',
-                                'libmp3lame',
-                                '-q:a',
-                                '2',  # 高质量 (2-最高质量, 9-最低质量)
-                                '-y',  # 覆盖输出
-                                str(temp_output),
-                            ]
-                        elif file_ext in ['.m4a', '.aac']:
-                            # AAC格式，保持较好质量
-                            cmd = [
-                                ffmpeg_path,
-                                '-i',
-                                str(audio_file),
-                                '-codec:a',
-                                'libmp3lame',
-                                '-b:a',
-                                '192k',  # 192kbps比特率
-                                '-y',
-                                str(temp_output),
-                            ]
-                        elif file_ext in ['.ogg']:
-                            # OGG Vorbis格式
-                            cmd = [
-                                ffmpeg_path,
-                                '-i',
-                                str(audio_file),
-                                '-codec:a',
-                                'libmp3lame',
-                                '-b:a',
-                                '160k',
-                                '-y',
-                                str(temp_output),
-                            ]
-                        elif file_ext in ['.wma']:
-                            # WMA格式
-                            cmd = [
-                                ffmpeg_path,
-                                '-i',
-                                str(audio_file),
-                                '-codec:a',
-                                'libmp3lame',
-                                '-b:a',
-                                '128k',
-                                '-y',
-                                str(temp_output),
-                            ]
-                        else:
-                            # 其他格式，使用默认设置
-                            cmd = [
-                                ffmpeg_path,
-                                '-i',
-                                str(audio_file),
-                                '-codec:a',
-                                'libmp3lame',
-                                '-b:a',
-                                '128k',
-                                '-y',
-                                str(temp_output),
-                            ]
-
-                        # 执行ffmpeg转换
-                        startupinfo = None
-                        if sys.platform == 'win32':
-                            startupinfo = subprocess.STARTUPINFO()
-                            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                            startupinfo.wShowWindow = subprocess.SW_HIDE
-
-                        result = subprocess.run(
-                            cmd,
-                            startupinfo=startupinfo,
-                            capture_output=True,
-                            text=True,
-                            encoding='utf-8',
-                            errors='ignore',
-                            timeout=30,  # 30秒超时
-                        )
-
-                        if result.returncode == 0:
+                        # 构建ffmpeg转换命令（各格式的编码参数见 core/transcode.py）
+                        cmd = mp3_cmd(audio_file, temp_output, ffmpeg_path)
+
+                        # 执行ffmpeg转换（带进度，可取消）
+                        def file_progress(percent, eta, i=i):
+                            self._report_progress(
+                                idx, total_folders, i, len(audio_files), percent
+                            )
+
+                        try:
+                            run_ffmpeg(
+                                cmd,
+                                on_progress=file_progress,
+                                cancel_event=self.cancel_event,
+                                timeout=30,  # 30秒超时
+                            )
+                            ok = True
+                        except subprocess.CalledProcessError as e:
+                            ok = False
+                            print(f"FFmpeg转换失败 {audio_file}: {e.stderr[:100]}")
+
+                        if ok:
                             # 转换成功，重命名为最终文件名
                             if temp_output.exists():
                                 # 如果目标文件已存在，先删除
@@ -197,8 +169,6 @@ class AudioProcessor(QThread):
                             else:
                                 print(f"转换失败: 输出文件不存在 {temp_output}")
                         else:
-                            print(f"FFmpeg转换失败 {audio_file}: {result.stderr[:100]}")
-
                             # 尝试简单命令作为备选方案
                             try:
                                 simple_cmd = [
@@ -207,18 +177,24 @@ class AudioProcessor(QThread):
                                     str(audio_file),
                                     str(output_file),
                                 ]
-                                subprocess.run(
+                                run_ffmpeg(
                                     simple_cmd,
-                                    startupinfo=startupinfo,
-                                    capture_output=True,
+                                    cancel_event=self.cancel_event,
                                     timeout=30,
                                 )
                                 if output_file.exists():
                                     audio_file.unlink()
                                     print(f"简单转换成功: {audio_file.name}")
+                            except FFmpegCancelled:
+                                raise
                             except Exception as e2:
                                 print(f"备选方案也失败: {e2}")
 
+                    except FFmpegCancelled:
+                        # 删除转换到一半的临时文件
+                        if temp_output.exists():
+                            temp_output.unlink()
+                        raise
                     except subprocess.TimeoutExpired:
                         print(f"转换超时: {audio_file.name}")
                     except Exception as e:
@@ -255,6 +231,9 @@ class AudioProcessor(QThread):
             self.status_signal.emit("音频整理完成！")
             self.finished_signal.emit(True)
 
+        except FFmpegCancelled:
+            self.status_signal.emit("已取消整理")
+            self.finished_signal.emit(False)
         except Exception as e:
             self.status_signal.emit(f"处理出错: {str(e)}")
             self.finished_signal.emit(False)
@@ -262,60 +241,242 @@ class AudioProcessor(QThread):
 
 class ConcatWorker(QThread):
     status = pyqtSignal(str)  # 实时状态
+    progress = pyqtSignal(int)  # 百分比
     error = pyqtSignal(str)  # 错误信息
+    cancelled = pyqtSignal()  # 已取消
     done = pyqtSignal(str)  # 返回最终 mp3 路径
 
-    def __init__(self, ffmpeg_path, list_file, out_file):
+    def __init__(
+        self, text, out_file, library, extra_formats=(), export_alignment=False
+    ):
+        """在后台为 text 挑选音频（按需转码）并拼接
+
+        extra_formats: 额外输出格式的扩展名（如 ".wav"、".opus"），与 mp3 一次生成
+        export_alignment: 为 True 时同时导出逐字时间轴（.srt / .json）
+        """
         super().__init__()
-        self.ffmpeg_path = ffmpeg_path
-        self.list_file = list_file
+        self.text = text
         self.out_file = out_file
+        base = os.path.splitext(out_file)[0]
+        self.outputs = [out_file] + [base + ext for ext in extra_formats]
+        self.library = library
+        self.selection = []
+        self.export_alignment = export_alignment
+        self.alignment_error = None  # 时间轴导出失败的原因，音频本身仍然有效
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _on_progress(self, percent, eta):
+        self.progress.emit(int(percent))
+        if eta is None:
+            self.status.emit(f"正在生成音频... {percent:.0f}%")
+        else:
+            self.status.emit(
+                f"正在生成音频... {percent:.0f}%，剩余约 {format_eta(eta)}"
+            )
+
+    def _on_select(self, done, total):
+        self.progress.emit(int(done / total * 100))
+        self.status.emit(f"正在挑选音频... {done}/{total}")
 
     def run(self):
         try:
+            self.status.emit("正在挑选音频……")
+            self.library.load(chars=self.text)
+            self.selection = self.library.select(
+                self.text, on_progress=self._on_select, cancel_event=self.cancel_event
+            )
+            audio_files = [path for _, path in self.selection]
+            if not audio_files:
+                self.error.emit("没有可用音频")
+                return
+
             self.status.emit("正在拼接音频……")
-            cmd = [
-                self.ffmpeg_path,
-                '-f',
-                'concat',
-                '-safe',
-                '0',
-                '-i',
-                self.list_file,
-                '-c:a',
-                'libmp3lame',
-                '-b:a',
-                '192k',
-                '-y',
-                self.out_file,
-            ]
-
-            startupinfo = None
-            if sys.platform == 'win32':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-
-            subprocess.run(
-                cmd,
-                startupinfo=startupinfo,
-                check=True,
-                capture_output=True,
-                encoding='utf-8',
+            self.progress.emit(0)
+            # 时长取自元数据或 mp3 文件头，不逐个启动 ffprobe；得不到时只显示状态
+            duration = self.library.total_duration(audio_files)
+            self.library.save_meta()
+            AudioConcatenator().concat(
+                audio_files,
+                self.outputs,
+                on_progress=self._on_progress,
+                cancel_event=self.cancel_event,
+                duration=duration,
             )
+            if self.export_alignment:
+                self._export_alignment()
             self.done.emit(self.out_file)
+        except FFmpegCancelled:
+            self.cancelled.emit()
         except subprocess.CalledProcessError as e:
-            self.error.emit("FFmpeg 拼接失败：\n" + e.stderr)
+            self.error.emit("FFmpeg 拼接失败：\n" + (e.stderr or ""))
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def _export_alignment(self):
+        """导出逐字时间轴；失败（如缺少 ffprobe）不影响已生成的音频"""
+        self.status.emit("正在导出时间轴……")
+        try:
+            alignment = library_alignment(self.library, self.selection)
+            base = os.path.splitext(self.out_file)[0]
+            write_alignment(alignment, base + ".srt")
+            write_alignment(alignment, base + ".json")
+        except (OSError, subprocess.CalledProcessError) as e:
+            self.alignment_error = str(e)
+
+
+class CacheWarmer(QThread):
+    """后台预热：把主播的非 mp3 音频提前转码进缓存（可选，不预热也能直接生成）"""
+
+    progress = pyqtSignal(int)
+    status = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool)
+
+    def __init__(self, voice_dir, speaker):
+        super().__init__()
+        self.library = AudioLibrary(voice_dir, speaker)
+        self.cancel_event = threading.Event()
+        self.failures = []  # 转码失败的 (字符, 文件名, 原因)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _on_progress(self, done, total):
+        self.progress.emit(int(done / total * 100))
+        self.status.emit(f"正在预热转码缓存... {done}/{total}")
+
+    def run(self):
+        try:
+            self.library.load()
+            self.failures = self.library.warm_up(self._on_progress, self.cancel_event)
+            self.finished_signal.emit(not self.cancel_event.is_set())
+        except Exception as e:
+            self.status.emit(f"预热出错: {str(e)}")
+            self.finished_signal.emit(False)
+
+
+class PreviewWorker(QThread):
+    """实时预览：在后台增量渲染，结果为内存中的 PCM"""
+
+    ready = pyqtSignal(bytes)
+    error = pyqtSignal(str)
+
+    def __init__(self, session, text, load_library=False):
+        super().__init__()
+        self.session = session
+        self.text = text
+        self.load_library = load_library
+
+    def run(self):
+        try:
+            if self.load_library:
+                self.session.library.load()
+            self.ready.emit(self.session.update(self.text))
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class DecodeWorker(QThread):
+    """在后台把整个音频文件解码为 PCM，供播放使用"""
+
+    ready = pyqtSignal(bytes)
+    error = pyqtSignal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def run(self):
+        try:
+            self.ready.emit(bytes(AudioConcatenator().decode(self.path)))
         except Exception as e:
             self.error.emit(str(e))
 
 
+class SpeakerScanner(QThread):
+    """后台扫描主播文件夹，边扫描边把结果发给界面"""
+
+    found = pyqtSignal(str)
+    finished_scan = pyqtSignal(int)  # 主播总数
+
+    def __init__(self, voice_dir):
+        super().__init__()
+        self.voice_dir = voice_dir
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        count = 0
+        try:
+            for speaker in iter_subdirs(self.voice_dir):
+                if self.stop_event.is_set():
+                    return
+                self.found.emit(speaker)
+                count += 1
+        except OSError:
+            pass
+        self.finished_scan.emit(count)
+
+
+class CharScanner(QThread):
+    """后台扫描主播的单字文件夹，分批发送 字符 → 音频文件列表"""
+
+    batch = pyqtSignal(dict)
+    finished_scan = pyqtSignal()
+
+    BATCH_SIZE = 200
+
+    def __init__(self, speaker_path):
+        super().__init__()
+        self.speaker_path = speaker_path
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        pending = {}
+        try:
+            for char in iter_subdirs(self.speaker_path):
+                if self.stop_event.is_set():
+                    return
+                try:
+                    pending[char] = list_audio(
+                        os.path.join(self.speaker_path, char), AUDIO_EXTS
+                    )
+                except OSError:
+                    pending[char] = []
+                if len(pending) >= self.BATCH_SIZE:
+                    self.batch.emit(pending)
+                    pending = {}
+        except OSError:
+            pass
+        if pending:
+            self.batch.emit(pending)
+        self.finished_scan.emit()
+
+
 class LiveTypePrinter(QMainWindow):
     def __init__(self):
         super().__init__()
         self.voice_dir = "voice"  # 默认音频文件夹
         self.current_speaker = None
         self.char_audio_map = {}  # 存储字符对应的音频文件列表
+        self.char_folders = []
+        self.chars_scanned = False  # 单字文件夹是否已扫描完
+        self.speaker_scanner = None
+        self.char_scanner = None
+        self.worker = None  # 当前正在运行的后台任务（整理 / 生成）
+        self.preview_session = None  # 实时预览的增量渲染缓存，切换主播后重建
+        self.preview_worker = None
+        self.preview_pending = False  # 预览渲染中又有新的输入
+        self.play_worker = None  # 播放生成结果前的后台解码
+        self.audio_output = None
+        self.audio_buffer = None
         self.init_ui()
         self.load_speakers()
 
@@ -464,13 +625,20 @@ class LiveTypePrinter(QMainWindow):
         self.organize_button.clicked.connect(self.organize_audio)
         self.organize_button.setEnabled(False)
 
+        # 非 mp3 音频在第一次用到时自动转码，预热只是提前把缓存填满
+        self.warm_button = QPushButton("预热转码缓存")
+        self.warm_button.setStyleSheet("background-color: #795548; font-size: 14px;")
+        self.warm_button.clicked.connect(self.warm_cache)
+        self.warm_button.setEnabled(False)
+
         # 添加到控制布局
         control_layout.addWidget(speaker_label, 0, 0)
         control_layout.addWidget(self.speaker_combo, 0, 1, 1, 2)
         control_layout.addWidget(refresh_button, 0, 3)
         control_layout.addWidget(self.dir_label, 1, 0, 1, 2)
         control_layout.addWidget(self.dir_button, 1, 2, 1, 2)
-        control_layout.addWidget(self.organize_button, 2, 0, 1, 4)
+        control_layout.addWidget(self.organize_button, 2, 0, 1, 2)
+        control_layout.addWidget(self.warm_button, 2, 2, 1, 2)
 
         control_group.setLayout(control_layout)
         main_layout.addWidget(control_group)
@@ -529,6 +697,13 @@ class LiveTypePrinter(QMainWindow):
         )
         self.text_input.setPlaceholderText("请输入要转换的文字...")
         self.text_input.setMinimumHeight(120)
+        self.text_input.textChanged.connect(self.schedule_preview)
+
+        # 停止输入一段时间后再渲染预览（防抖）
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(500)
+        self.preview_timer.timeout.connect(self.run_preview)
 
         input_buttons_layout = QHBoxLayout()
         input_buttons_layout.setSpacing(10)
@@ -542,8 +717,28 @@ class LiveTypePrinter(QMainWindow):
         self.clear_button.setStyleSheet("background-color: #9E9E9E;")
         self.clear_button.clicked.connect(self.clear_text)
 
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setStyleSheet("background-color: #f44336;")
+        self.cancel_button.clicked.connect(self.cancel_task)
+        self.cancel_button.setEnabled(False)
+
         input_buttons_layout.addWidget(self.generate_button)
         input_buttons_layout.addWidget(self.clear_button)
+        input_buttons_layout.addWidget(self.cancel_button)
+
+        self.preview_check = QCheckBox("实时预览")
+        self.preview_check.toggled.connect(self.schedule_preview)
+        input_buttons_layout.addWidget(self.preview_check)
+
+        self.alignment_check = QCheckBox("导出逐字时间轴")
+        self.alignment_check.setToolTip("生成时同时输出同名 .srt 和 .json")
+        input_buttons_layout.addWidget(self.alignment_check)
+
+        # 额外格式与 mp3 由同一次解码拼接生成
+        self.wav_check = QCheckBox("同时输出 WAV")
+        self.opus_check = QCheckBox("同时输出 Opus")
+        input_buttons_layout.addWidget(self.wav_check)
+        input_buttons_layout.addWidget(self.opus_check)
         input_buttons_layout.addStretch()
 
         input_layout.addWidget(self.text_input)
@@ -589,7 +784,9 @@ class LiveTypePrinter(QMainWindow):
             self.load_speakers()
 
     def load_speakers(self):
-        """加载主播列表"""
+        """加载主播列表（后台扫描，结果陆续加入下拉框）"""
+        if self.speaker_scanner is not None:
+            self.speaker_scanner.stop()
         self.speaker_combo.clear()
 
         if not os.path.exists(self.voice_dir):
@@ -598,64 +795,86 @@ class LiveTypePrinter(QMainWindow):
             )
             return
 
-        speakers = [
-            d
-            for d in os.listdir(self.voice_dir)
-            if os.path.isdir(os.path.join(self.voice_dir, d))
-        ]
-
-        if speakers:
-            self.speaker_combo.addItems(speakers)
-        else:
+        self.status_label.setText("正在扫描主播...")
+        # 挂到窗口上，旧的扫描线程被替换后也能安全跑完再释放
+        self.speaker_scanner = SpeakerScanner(self.voice_dir)
+        self.speaker_scanner.setParent(self)
+        self.speaker_scanner.finished.connect(self.speaker_scanner.deleteLater)
+        self.speaker_scanner.found.connect(self._speaker_found)
+        self.speaker_scanner.finished_scan.connect(self._speakers_loaded)
+        self.speaker_scanner.start()
+
+    def _speaker_found(self, speaker):
+        if self.sender() is self.speaker_scanner:
+            self.speaker_combo.addItem(speaker)
+
+    def _speakers_loaded(self, count):
+        if self.sender() is not self.speaker_scanner:
+            return
+        if not count:
             self.speaker_combo.addItem("未找到主播")
+        self.status_label.setText("就绪")
 
     def change_speaker(self, speaker):
         """切换主播"""
         if speaker and speaker != "未找到主播":
             self.current_speaker = speaker
             self.organize_button.setEnabled(True)
+            self.warm_button.setEnabled(True)
             self.generate_button.setEnabled(True)
             self.load_char_audio()
         else:
             self.current_speaker = None
             self.organize_button.setEnabled(False)
+            self.warm_button.setEnabled(False)
             self.generate_button.setEnabled(False)
             self.char_audio_map = {}
             self.update_info_label()
 
     def load_char_audio(self):
         """加载主播的字符音频信息"""
+        self.preview_session = None
         if not self.current_speaker:
             return
 
+        if self.char_scanner is not None:
+            self.char_scanner.stop()
+
         speaker_path = os.path.join(self.voice_dir, self.current_speaker)
         self.char_audio_map = {}
+        self.char_folders = []
+        self.chars_scanned = False
+        self.update_info_label()
 
-        # 获取所有单字文件夹
-        self.char_folders = [
-            f
-            for f in os.listdir(speaker_path)
-            if os.path.isdir(os.path.join(speaker_path, f))
-        ]
-
-        for char in self.char_folders:
-            char_path = os.path.join(speaker_path, char)
-            # 获取该字符的所有音频文件
-            audio_files = [
-                f for f in os.listdir(char_path) if f.lower().endswith('.mp3')
-            ]
-            if audio_files:
-                self.char_audio_map[char] = audio_files
+        # 后台扫描单字文件夹，字符数随扫描结果实时更新
+        self.char_scanner = CharScanner(speaker_path)
+        self.char_scanner.setParent(self)
+        self.char_scanner.finished.connect(self.char_scanner.deleteLater)
+        self.char_scanner.batch.connect(self._chars_found)
+        self.char_scanner.finished_scan.connect(self._chars_loaded)
+        self.char_scanner.start()
 
-        self.update_info_label()
+    def _chars_found(self, batch):
+        if self.sender() is not self.char_scanner:
+            return
+        self.char_folders.extend(batch)
+        self.char_audio_map.update((c, f) for c, f in batch.items() if f)
+        self.update_info_label(scanning=True)
 
-    def update_info_label(self):
+    def _chars_loaded(self):
+        if self.sender() is self.char_scanner:
+            self.chars_scanned = True
+            self.update_info_label()
+
+    def update_info_label(self, scanning=False):
         """更新信息标签"""
         if self.current_speaker:
             available_chars = len(self.char_folders)
             info_text = (
                 f"当前主播: {self.current_speaker}\n" f"可用字符: {available_chars}\n"
             )
+            if scanning:
+                info_text += "正在扫描..."
         else:
             info_text = "当前主播: 未选择\n可用字符: 0\n请先选择主播并设置音频目录"
         self.info_label.setText(info_text)
@@ -667,10 +886,7 @@ class LiveTypePrinter(QMainWindow):
             return
 
         # 禁用按钮，显示进度条
-        self.organize_button.setEnabled(False)
-        self.generate_button.setEnabled(False)
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
+        self.set_busy(True)
         self.status_label.setText("正在整理音频文件...")
 
         # 创建并启动处理线程
@@ -678,15 +894,63 @@ class LiveTypePrinter(QMainWindow):
         self.processor.progress_signal.connect(self.progress_bar.setValue)
         self.processor.status_signal.connect(self.status_label.setText)
         self.processor.finished_signal.connect(self.on_organization_finished)
+        self.worker = self.processor
         self.processor.start()
 
+    def warm_cache(self):
+        """后台预热当前主播的转码缓存"""
+        if not self.current_speaker:
+            QMessageBox.warning(self, "错误", "请先选择主播！")
+            return
+
+        self.set_busy(True)
+        self.status_label.setText("正在预热转码缓存...")
+        self.warmer = CacheWarmer(self.voice_dir, self.current_speaker)
+        self.warmer.progress.connect(self.progress_bar.setValue)
+        self.warmer.status.connect(self.status_label.setText)
+        self.warmer.finished_signal.connect(self.on_warm_finished)
+        self.worker = self.warmer
+        self.warmer.start()
+
+    def on_warm_finished(self, success):
+        self.set_busy(False)
+        failures = self.warmer.failures
+        if self.warmer.cancel_event.is_set():
+            self.status_label.setText("已取消预热")
+        elif success and failures:
+            self.status_label.setText(f"预热完成，{len(failures)} 个文件转码失败")
+            details = "\n".join(f"{c}/{name}: {err}" for c, name, err in failures[:10])
+            if len(failures) > 10:
+                details += f"\n……共 {len(failures)} 个"
+            QMessageBox.warning(self, "部分文件转码失败", details)
+        elif success:
+            self.status_label.setText("转码缓存已就绪")
+
+    def set_busy(self, busy):
+        """后台任务运行期间禁用操作按钮，显示进度条"""
+        self.organize_button.setEnabled(not busy)
+        self.warm_button.setEnabled(not busy)
+        self.generate_button.setEnabled(not busy)
+        self.cancel_button.setEnabled(busy)
+        self.progress_bar.setVisible(busy)
+        self.progress_bar.setValue(0)
+        if not busy:
+            self.worker = None
+
+    def cancel_task(self):
+        """取消当前后台任务"""
+        if self.worker is not None:
+            self.status_label.setText("正在取消...")
+            self.worker.cancel()
+
     def on_organization_finished(self, success):
         """整理完成后的处理"""
-        self.organize_button.setEnabled(True)
-        self.generate_button.setEnabled(True)
-        self.progress_bar.setVisible(False)
+        self.set_busy(False)
 
-        if success:
+        if self.processor.cancel_event.is_set():
+            self.load_char_audio()  # 已转换的部分仍然有效
+            self.status_label.setText("已取消整理")
+        elif success:
             QMessageBox.information(self, "完成", "音频整理完成！")
             self.load_char_audio()  # 重新加载音频信息
             self.status_label.setText("音频整理完成")
@@ -694,18 +958,17 @@ class LiveTypePrinter(QMainWindow):
             QMessageBox.warning(self, "错误", "音频整理过程中出现错误！")
             self.status_label.setText("整理失败")
 
-    def make_unique_path(self, path):
-
-        if not os.path.exists(path):
-            return path
-
+    def make_unique_path(self, path, extra_exts=()):
+        """返回不覆盖已有文件的路径；extra_exts 为同名的其他输出（如 .wav、.srt），
+        它们也都不存在时才采用该文件名"""
         base, ext = os.path.splitext(path)
+        exts = [ext] + list(extra_exts)
+        candidate = base
         counter = 2
-        while True:
-            new_path = f"{base}_{counter}{ext}"
-            if not os.path.exists(new_path):
-                return new_path
+        while any(os.path.exists(candidate + e) for e in exts):
+            candidate = f"{base}_{counter}"
             counter += 1
+        return candidate + ext
 
     def generate_audio(self):
         if not self.current_speaker:
@@ -717,10 +980,12 @@ class LiveTypePrinter(QMainWindow):
             QMessageBox.warning(self, "错误", "请输入要转换的文字！")
             return
 
-        lib = AudioLibrary(self.voice_dir, self.current_speaker)
-        lib.load()
+        if not self.chars_scanned:
+            QMessageBox.information(self, "提示", "正在扫描字库，请稍候再生成")
+            return
 
-        missing = [c for c in text if c.strip() and not lib.has_char(c)]
+        # 缺字检查复用后台扫描的结果，字库由 ConcatWorker 在后台只加载用到的字
+        missing = [c for c in text if c.strip() and c not in self.char_audio_map]
         if missing:
             if (
                 QMessageBox.question(
@@ -733,61 +998,162 @@ class LiveTypePrinter(QMainWindow):
             ):
                 return
 
-        audio_files = [
-            lib.random_audio(c) for c in text if c.strip() and lib.has_char(c)
-        ]
-
-        if not audio_files:
-            QMessageBox.warning(self, "错误", "没有可用音频")
-            return
-
         os.makedirs("输出目录", exist_ok=True)
         base_outfile = os.path.join(
             "输出目录", f"{self.current_speaker}_{text[:20]}.mp3"
         )
-        outfile = self.make_unique_path(base_outfile)
+        extra_formats = []
+        if self.wav_check.isChecked():
+            extra_formats.append(".wav")
+        if self.opus_check.isChecked():
+            extra_formats.append(".opus")
+        side_files = [".srt", ".json"] if self.alignment_check.isChecked() else []
+        outfile = self.make_unique_path(base_outfile, extra_formats + side_files)
 
         self.status_label.setText("正在生成音频...")
-        QApplication.processEvents()
-
-        try:
-            AudioConcatenator().concat(audio_files, outfile)
-            self.status_label.setText(f"生成完成：{os.path.basename(outfile)}")
-        except Exception as e:
-            QMessageBox.critical(self, "失败", str(e))
-            self.status_label.setText("生成失败")
+        self.set_busy(True)
+
+        self.concat_worker = ConcatWorker(
+            text,
+            outfile,
+            AudioLibrary(self.voice_dir, self.current_speaker),
+            extra_formats,
+            export_alignment=self.alignment_check.isChecked(),
+        )
+        self.concat_worker.status.connect(self._concat_status)
+        self.concat_worker.progress.connect(self.progress_bar.setValue)
+        self.concat_worker.error.connect(self._concat_error)
+        self.concat_worker.cancelled.connect(self._concat_cancelled)
+        self.concat_worker.done.connect(self._concat_done)
+        self.worker = self.concat_worker
+        self.concat_worker.start()
 
     def clear_text(self):
         """清空输入文本"""
         self.text_input.clear()
 
+    # -------------- 实时预览 --------------
+    def schedule_preview(self):
+        if self.preview_check.isChecked() and self.current_speaker:
+            self.preview_timer.start()
+        else:
+            self.preview_timer.stop()
+
+    def run_preview(self):
+        if self.preview_worker is not None and self.preview_worker.isRunning():
+            self.preview_pending = True
+            return
+
+        load_library = self.preview_session is None
+        if load_library:
+            self.preview_session = PreviewSession(
+                AudioLibrary(self.voice_dir, self.current_speaker)
+            )
+
+        self.preview_worker = PreviewWorker(
+            self.preview_session, self.text_input.toPlainText(), load_library
+        )
+        self.preview_worker.ready.connect(self._preview_ready)
+        self.preview_worker.error.connect(self._preview_error)
+        self.preview_worker.finished.connect(self._preview_finished)
+        self.preview_worker.start()
+
+    def _preview_ready(self, data):
+        if not self.preview_pending:  # 渲染期间文字又变了时旧结果不播放
+            self.play_pcm(data)
+
+    def _preview_finished(self):
+        """线程结束后再渲染最新文本（ready 发出时线程可能还没退出）"""
+        if self.sender() is self.preview_worker and self.preview_pending:
+            self.preview_pending = False
+            self.run_preview()
+
+    def _preview_error(self, msg):
+        self.preview_pending = False
+        self.preview_session = None
+        self.status_label.setText(f"预览失败：{msg}")
+
+    def play_pcm(self, data):
+        """从内存直接播放 PCM（格式见 core.pcm）"""
+        if self.audio_output is not None:
+            self.audio_output.stop()
+            self.audio_output.deleteLater()
+            self.audio_buffer.deleteLater()
+            self.audio_output = None
+        if not data:
+            return
+
+        fmt = QAudioFormat()
+        fmt.setSampleRate(pcm.SAMPLE_RATE)
+        fmt.setChannelCount(pcm.CHANNELS)
+        fmt.setSampleSize(pcm.SAMPLE_WIDTH * 8)
+        fmt.setCodec("audio/pcm")
+        fmt.setByteOrder(QAudioFormat.LittleEndian)
+        fmt.setSampleType(QAudioFormat.SignedInt)
+
+        self.audio_buffer = QBuffer(self)
+        self.audio_buffer.setData(QByteArray(data))
+        self.audio_buffer.open(QIODevice.ReadOnly)
+        self.audio_output = QAudioOutput(fmt, self)
+        self.audio_output.start(self.audio_buffer)
+
     # -------------- 槽：进度/错误/完成 --------------
     def _concat_status(self, msg):
         self.status_label.setText(msg)
 
     def _concat_error(self, msg):
+        self.set_busy(False)
         QMessageBox.critical(self, "拼接失败", msg)
         self.status_label.setText("生成失败")
 
+    def _concat_cancelled(self):
+        self.set_busy(False)
+        self.status_label.setText("已取消生成")
+        for path in self.concat_worker.outputs:
+            try:
+                os.remove(path)  # 删除未写完的文件
+            except OSError:
+                pass
+
     def _concat_done(self, outfile):
-        """拼接完成：清理临时文件 + 询问播放"""
-        try:
-            os.remove(self._temp_list_file)
-            os.rmdir(self._temp_dir)
-        except:
-            pass
+        """拼接完成：询问播放"""
+        self.set_busy(False)
         self.status_label.setText(f"音频生成完成：{os.path.basename(outfile)}")
+        message = f"已保存到：{outfile}\n"
+        if self.concat_worker.alignment_error:
+            message += (
+                "时间轴导出失败（请确认 ffprobe 可用）："
+                f"{self.concat_worker.alignment_error}\n"
+            )
         if (
             QMessageBox.question(
                 self,
                 "完成",
-                f"已保存到：{outfile}\n是否立即播放？",
+                message + "是否立即播放？",
                 QMessageBox.Yes | QMessageBox.No,
             )
             == QMessageBox.Yes
         ):
             self.play_audio(outfile)
 
+    def play_audio(self, path):
+        """在后台解码到内存，完成后播放；长音频解码期间界面不卡顿"""
+        if self.play_worker is not None and self.play_worker.isRunning():
+            return
+        self.status_label.setText("正在准备播放……")
+        self.play_worker = DecodeWorker(path)
+        self.play_worker.ready.connect(self._play_ready)
+        self.play_worker.error.connect(self._play_error)
+        self.play_worker.start()
+
+    def _play_ready(self, data):
+        self.status_label.setText("正在播放")
+        self.play_pcm(data)
+
+    def _play_error(self, msg):
+        self.status_label.setText("播放失败")
+        QMessageBox.critical(self, "播放失败", msg)
+
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,39 @@
+import pytest
+
+from core.audio_library import AudioLibrary
+
+# 1 秒的 CBR mp3（MPEG-1 Layer III，128 kbps）
+ONE_SECOND_MP3 = bytes([0xFF, 0xFB, 0x90, 0x00]) + b"\x00" * 15996
+
+
+@pytest.fixture
+def library(tmp_path):
+    for char in "你好":
+        folder = tmp_path / "主播" / char
+        folder.mkdir(parents=True)
+        (folder / f"{char}_1.mp3").write_bytes(ONE_SECOND_MP3)
+    lib = AudioLibrary(str(tmp_path), "主播")
+    lib.load()
+    return lib
+
+
+def test_total_duration_from_mp3_headers(library):
+    files = [path for _, path in library.select("你好你")]
+    assert library.total_duration(files) == pytest.approx(3.0)
+    assert len(library.meta) == 2  # 时长记入元数据
+
+    library.save_meta()
+    library.load_meta()
+    assert len(library.meta) == 2
+
+
+def test_total_duration_without_probe(library, tmp_path):
+    wav = tmp_path / "主播" / "好" / "好_2.wav"
+    wav.write_bytes(b"RIFF")
+    wav = str(wav)
+    assert library.duration(wav, probe=False) is None
+    assert library.total_duration([wav]) is None
+
+
+def test_select_skips_missing_chars(library):
+    assert [c for c, _ in library.select("你 x好")] == ["你", "好"]
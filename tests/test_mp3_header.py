@@ -0,0 +1,51 @@
+import struct
+
+import pytest
+
+from core.mp3_header import mp3_duration
+
+# MPEG-1 Layer III，128 kbps，44.1 kHz
+STEREO_HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+MONO_HEADER = bytes([0xFF, 0xFB, 0x90, 0xC0])
+
+
+def write(tmp_path, data, name="a.mp3"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def id3(size):
+    """size 字节内容的 ID3v2 标签（synchsafe 长度）"""
+    length = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00\x00" + length + b"\x00" * size
+
+
+def test_cbr_estimated_from_bitrate(tmp_path):
+    path = write(tmp_path, STEREO_HEADER + b"\x00" * 15996)
+    assert mp3_duration(path) == pytest.approx(1.0)
+
+
+def test_info_header_frame_count(tmp_path):
+    # 单声道 MPEG-1 的边信息为 17 字节，Info 头紧随其后
+    info = b"Info" + struct.pack(">II", 1, 100)
+    path = write(tmp_path, MONO_HEADER + b"\x00" * 17 + info + b"\x00" * 400)
+    assert mp3_duration(path) == pytest.approx(100 * 1152 / 44100)
+
+
+def test_xing_header_after_id3_tag(tmp_path):
+    xing = b"Xing" + struct.pack(">II", 1, 38)
+    frame = STEREO_HEADER + b"\x00" * 32 + xing + b"\x00" * 400
+    path = write(tmp_path, id3(300) + frame)
+    assert mp3_duration(path) == pytest.approx(38 * 1152 / 44100)
+
+
+def test_vbri_header(tmp_path):
+    vbri = b"VBRI" + b"\x00" * 10 + struct.pack(">I", 50)
+    path = write(tmp_path, STEREO_HEADER + b"\x00" * 32 + vbri + b"\x00" * 400)
+    assert mp3_duration(path) == pytest.approx(50 * 1152 / 44100)
+
+
+def test_not_mp3(tmp_path):
+    assert mp3_duration(write(tmp_path, b"RIFF" + b"\x00" * 100, "a.wav")) is None
+    assert mp3_duration(str(tmp_path / "missing.mp3")) is None
@@ -0,0 +1,93 @@
+import random
+import itertools
+
+from core.phrase_memo import PhraseMemo
+
+
+def numbered():
+    """每次调用给出不同的 PCM，模拟每次随机选到不同的音频"""
+    counter = itertools.count()
+    return lambda c: f"{c}{next(counter)}".encode()
+
+
+def stored(memo):
+    return sorted(phrase for _, phrase in memo.segments)
+
+
+def test_not_stored_until_hot():
+    memo = PhraseMemo(hot_count=3, variants=1)
+    render_char = numbered()
+    memo.render("k", "你好", render_char)
+    memo.render("k", "你好", render_char)
+    assert stored(memo) == []
+    memo.render("k", "你好", render_char)
+    assert stored(memo) == ["你好"]
+
+
+def test_remember_keeps_only_longest_phrase():
+    memo = PhraseMemo(hot_count=1, variants=1, max_n=4)
+    memo.render("k", "你好世界", numbered())
+    assert stored(memo) == ["你好世界"]
+    assert memo.size == len(b"".join(memo.segments["k", "你好世界"][0]))
+
+
+def test_longer_phrase_promoted_after_prefix_cached():
+    memo = PhraseMemo(hot_count=2, variants=1)
+    render_char = numbered()
+    for _ in range(2):
+        memo.render("k", "你好", render_char)
+    assert stored(memo) == ["你好"]
+
+    for _ in range(3):
+        memo.render("k", "你好世界", render_char)
+    assert "你好世界" in stored(memo)
+    # 命中 "你好世界" 时整段复用，逐字 PCM 与记下的组合一致
+    assert memo.render("k", "你好世界", render_char) == list(
+        memo.segments["k", "你好世界"][0]
+    )
+
+
+def test_variants_collected_before_hits():
+    memo = PhraseMemo(hot_count=1, variants=3)
+    render_char = numbered()
+    results = [tuple(memo.render("k", "你好", render_char)) for _ in range(3)]
+    assert len(set(results)) == 3  # 收集期间每次都重新随机挑选
+    assert len(memo.segments["k", "你好"]) == 3
+
+    random.seed(0)
+    hits = {tuple(memo.render("k", "你好", render_char)) for _ in range(30)}
+    assert hits == set(results)  # 收集满后在几种组合间随机轮换
+    assert len(memo.segments["k", "你好"]) == 3
+
+
+def test_plan_returns_picks_for_misses():
+    memo = PhraseMemo(hot_count=1, variants=1)
+    memo.render("k", "你好", lambda c: c.encode())
+    pieces = memo.plan("k", "你好吗", lambda c: f"path/{c}")
+    assert pieces == ["你".encode(), "好".encode(), "path/吗"]
+
+
+def test_keys_are_separate():
+    memo = PhraseMemo(hot_count=1, variants=1)
+    memo.render("a", "你好", lambda c: b"a")
+    assert memo.lookup("b", "你好", 0) is None
+    assert memo.lookup("a", "你好", 0) == ((b"a", b"a"), 2)
+
+
+def test_eviction_drops_least_recently_used():
+    memo = PhraseMemo(max_bytes=8, hot_count=1, variants=1, max_n=2)
+    render_char = lambda c: b"xx"
+    memo.render("k", "甲乙", render_char)
+    memo.render("k", "丙丁", render_char)
+    assert stored(memo) == ["丙丁", "甲乙"]
+
+    memo.lookup("k", "甲乙", 0)  # 甲乙 变为最近使用
+    memo.render("k", "戊己", render_char)
+    assert stored(memo) == ["戊己", "甲乙"]
+    assert memo.size == 8
+
+
+def test_oversized_variant_not_stored():
+    memo = PhraseMemo(max_bytes=3, hot_count=1, variants=1)
+    memo.render("k", "你好", lambda c: b"xx")
+    assert stored(memo) == [] and memo.size == 0
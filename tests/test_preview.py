@@ -0,0 +1,68 @@
+import pytest
+
+from core.preview import PreviewSession
+
+
+class StubLibrary:
+    """每个字只有一条音频，路径即 字.mp3"""
+
+    def __init__(self, chars):
+        self.chars = set(chars)
+
+    def snapshot(self):
+        return self.chars
+
+    def random_audio(self, char, snapshot):
+        return f"{char}.mp3"
+
+
+class StubConcatenator:
+    """PCM 为路径本身，记录解码过的路径"""
+
+    def __init__(self):
+        self.calls = []
+
+    def decode(self, path):
+        self.calls.append(path)
+        return path.encode()
+
+
+@pytest.fixture
+def session():
+    return PreviewSession(StubLibrary("你好世界再见"), StubConcatenator())
+
+
+def expected(text):
+    return b"".join(f"{c}.mp3".encode() for c in text if c in "你好世界再见")
+
+
+@pytest.mark.parametrize(
+    "before, after",
+    [
+        ("你好", "你好世界"),  # 末尾追加
+        ("世界", "你好世界"),  # 开头插入
+        ("你好世界", "你世界"),  # 删除
+        ("你好世界", "你再见界"),  # 替换
+        ("你好 世界", "你好 x世界"),  # 插入缺字
+        ("你好世界", ""),  # 清空
+    ],
+)
+def test_update_splices_changed_range(session, before, after):
+    session.update(before)
+    assert session.update(after) == expected(after)
+    assert len(session.clips) == len(session.segments) == len(after)
+
+
+def test_update_decodes_only_changed_chars(session):
+    session.update("你好世界")
+    session.concatenator.calls.clear()
+    session.update("你好再见世界")
+    assert session.concatenator.calls == ["再.mp3", "见.mp3"]
+
+
+def test_decoded_is_pruned_to_current_clips(session):
+    session.update("你好世界")
+    session.update("你好")
+    assert set(session.decoded) == {"你.mp3", "好.mp3"}
+    session.update("")
+    assert session.decoded == {}
@@ -0,0 +1,85 @@
+import os
+import json
+
+import pytest
+
+from core import pcm
+from core.script import ScriptRenderer, parse_script
+
+ONE_SECOND_MP3 = bytes([0xFF, 0xFB, 0x90, 0x00]) + b"\x00" * 15996
+
+
+class StubConcatenator:
+    """按文件名生成可辨认的 PCM，记录每次批量解码的路径"""
+
+    clip_cache = None
+
+    def __init__(self):
+        self.batches = []
+
+    def decode_many(self, audio_files):
+        paths = list(audio_files)
+        self.batches.append(paths)
+        return {p: os.path.basename(p).encode() for p in paths}
+
+    def encode(self, pcm_data, output=None, target=None):
+        return bytes(pcm_data)
+
+
+@pytest.fixture
+def voice_dir(tmp_path):
+    for speaker, chars in (("小李", "你好"), ("小王", "是啊")):
+        for char in chars:
+            folder = tmp_path / speaker / char
+            folder.mkdir(parents=True)
+            (folder / f"{char}_1.mp3").write_bytes(ONE_SECOND_MP3)
+    return str(tmp_path)
+
+
+def test_render_decodes_all_clips_in_one_batch(voice_dir):
+    concatenator = StubConcatenator()
+    renderer = ScriptRenderer(voice_dir, concatenator, memo=False)
+    events = parse_script("[小李]你好你<100ms>[小王]是x啊")
+
+    data = renderer.render(events)
+    silence = pcm.silence(0.1)
+    expected = (
+        "你_1.mp3好_1.mp3你_1.mp3".encode() + silence + "是_1.mp3啊_1.mp3".encode()
+    )
+    assert data == expected
+    assert len(concatenator.batches) == 1
+    assert len(set(concatenator.batches[0])) == 4
+
+
+def test_render_with_memo_skips_cached_phrases(voice_dir):
+    concatenator = StubConcatenator()
+    renderer = ScriptRenderer(voice_dir, concatenator)
+    renderer.memo.hot_count = 1
+    renderer.memo.variants = 1
+    events = parse_script("[小李]你好")
+
+    first = renderer.render(events)
+    second = renderer.render(events)
+    assert first == second == "你_1.mp3好_1.mp3".encode()
+    assert concatenator.batches[-1] == []  # 第二次整段命中，不再解码
+
+
+def test_render_writes_alignment_with_pauses(voice_dir, tmp_path):
+    class HalfSecondClips(StubConcatenator):
+        def decode_many(self, audio_files):
+            return {p: pcm.silence(0.5) for p in audio_files}
+
+    renderer = ScriptRenderer(voice_dir, HalfSecondClips(), memo=False)
+    events = parse_script("[小李]你好<1s>[小王]是")
+    srt, js = str(tmp_path / "out.srt"), str(tmp_path / "out.json")
+
+    renderer.render(events, alignment=[srt, js])
+    with open(js, encoding="utf-8") as f:
+        timeline = json.load(f)
+    assert timeline == [
+        {"char": "你", "start": 0.0, "end": 0.5},
+        {"char": "好", "start": 0.5, "end": 1.0},
+        {"char": "是", "start": 2.0, "end": 2.5},
+    ]
+    with open(srt, encoding="utf-8") as f:
+        assert "00:00:02,000 --> 00:00:02,500\n是" in f.read()
@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+
+import pytest
+
+from core.shared_cache import SharedClipCache, _HEADER, _HEADER_OFFSET, _RECORD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache():
+    cache = SharedClipCache.create(64 * 1024, index_size=_RECORD.size * 16)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def reader(cache):
+    reader = SharedClipCache.attach(cache.name)
+    yield reader
+    reader.close()
+
+
+def test_put_and_read(cache, reader):
+    assert cache.put("a.mp3", b"aaaa")
+    assert reader.read("a.mp3") == b"aaaa"
+    assert reader.read("b.mp3") is None
+    assert "a.mp3" in reader and len(reader) == 1
+
+
+def test_read_returns_single_copy(cache, reader):
+    cache.put("a.mp3", b"abcd")
+    data = reader.read("a.mp3")
+    assert isinstance(data, bytearray) and data == b"abcd"
+
+
+def test_owner_threads_share_instance(cache):
+    size = cache.capacity // 8
+    errors = []
+
+    def worker(n):
+        for i in range(50):
+            key = f"{n}-{i}.mp3"
+            cache.put(key, bytes([n]) * size)
+            data = cache.read(key)
+            if data is not None and data != bytes([n]) * size:
+                errors.append(key)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(cache) <= 8
+
+
+def test_get_is_zero_copy_view(cache, reader):
+    cache.put("a.mp3", b"abcd")
+    view = reader.get("a.mp3")
+    assert isinstance(view, memoryview) and view == b"abcd"
+    view.release()
+
+
+def test_read_into_appends(cache, reader):
+    cache.put("a.mp3", b"aa")
+    cache.put("b.mp3", b"bb")
+    out = bytearray(b"--")
+    assert reader.read_into("a.mp3", out)
+    assert reader.read_into("b.mp3", out)
+    assert not reader.read_into("c.mp3", out)
+    assert out == b"--aabb"
+
+
+def test_reader_sees_later_writes(cache, reader):
+    cache.put("a.mp3", b"1")
+    assert len(reader) == 1
+    cache.put("b.mp3", b"2")
+    assert reader.read("b.mp3") == b"2"
+    assert len(reader) == 2
+
+
+def test_attach_only_reads(reader):
+    with pytest.raises(PermissionError):
+        reader.put("a.mp3", b"x")
+
+
+def test_eviction_when_data_full(cache, reader):
+    size = cache.capacity // 4
+    for i in range(6):
+        assert cache.put(f"{i}.mp3", bytes([i]) * size)
+
+    # 数据区只放得下 4 条，最旧的两条被淘汰
+    assert [k for k in map("{}.mp3".format, range(6)) if k in reader] == [
+        "2.mp3",
+        "3.mp3",
+        "4.mp3",
+        "5.mp3",
+    ]
+    for i in range(2, 6):
+        assert reader.read(f"{i}.mp3") == bytes([i]) * size
+
+
+def test_wrap_drops_entries_in_unused_tail(cache, reader):
+    third = cache.capacity // 3
+    cache.put("a.mp3", b"a" * third)
+    cache.put("b.mp3", b"b" * third)
+    cache.put("c.mp3", b"c" * (third - 10))  # 末尾剩下不到 1/3
+    cache.put("d.mp3", b"d" * third)  # 绕回开头，淘汰 a
+    cache.put("e.mp3", b"e" * 5)  # 紧跟 d，淘汰 b
+    assert [k for k in "abcde" if f"{k}.mp3" in reader] == ["c", "d", "e"]
+
+    # 再次绕回：末尾的 c 虽然不和新数据重叠，但它最旧，必须先于 d、e 淘汰
+    cache.put("f.mp3", b"f" * (2 * third))
+    assert [k for k in "cdef" if f"{k}.mp3" in reader] == ["f"]
+    assert reader.read("f.mp3") == b"f" * (2 * third)
+
+
+def test_eviction_when_index_full(cache, reader):
+    for i in range(cache.slots + 5):
+        cache.put(f"{i}.mp3", b"x")
+    assert len(cache) == cache.slots
+    assert len(reader) == cache.slots
+    assert "4.mp3" not in reader
+    assert reader.read(f"{cache.slots + 4}.mp3") == b"x"
+
+
+def test_reevicted_key_can_be_put_again(cache, reader):
+    size = cache.capacity // 2
+    cache.put("a.mp3", b"a" * size)
+    cache.put("b.mp3", b"b" * size)
+    cache.put("c.mp3", b"c" * size)
+    assert "a.mp3" not in reader
+    cache.put("a.mp3", b"A" * size)
+    assert reader.read("a.mp3") == b"A" * size
+    assert len(reader) == 2
+
+
+def test_too_large_is_rejected(cache):
+    assert not cache.put("big.mp3", b"x" * (cache.capacity + 1))
+    assert len(cache) == 0
+
+
+def test_reader_waits_while_write_in_progress(cache, reader):
+    cache.put("a.mp3", b"a")
+    version = _HEADER.unpack_from(cache.shm.buf, _HEADER_OFFSET)[0]
+    # 模拟写入进行中：版本号为奇数时读取方必须等待
+    _HEADER.pack_into(cache.shm.buf, _HEADER_OFFSET, version + 1, 0, 1)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(reader.read("a.mp3")))
+    thread.start()
+    time.sleep(0.1)
+    assert thread.is_alive() and not result
+
+    _HEADER.pack_into(cache.shm.buf, _HEADER_OFFSET, version + 2, 0, 1)
+    thread.join(5)
+    assert result == [b"a"]
+
+
+def test_read_retries_when_entry_evicted_during_copy(cache, reader):
+    size = cache.capacity // 2
+    cache.put("a.mp3", b"a" * size)
+    cache.put("b.mp3", b"b" * size)
+    reader.read("b.mp3")
+
+    # 拷贝 a 的过程中创建者写入 c 并淘汰了 a：读取方应判定无效并返回未命中
+    version = reader._read_version
+    calls = []
+
+    def read_version():
+        if not calls:
+            calls.append(1)
+            cache.put("c.mp3", b"c" * size)
+        return version()
+
+    reader._read_version = read_version
+    out = bytearray(b"--")
+    assert not reader.read_into("a.mp3", out)
+    assert out == b"--"
+
+
+def test_attach_from_child_process(cache):
+    cache.put("a.mp3", b"hello")
+    code = (
+        "import sys\n"
+        "from core.shared_cache import SharedClipCache\n"
+        "cache = SharedClipCache.attach(sys.argv[1])\n"
+        "sys.stdout.write(cache.read('a.mp3').decode())\n"
+        "cache.close()\n"
+    )
+    for _ in range(2):  # 子进程退出后共享内存仍然有效
+        out = subprocess.run(
+            [sys.executable, "-c", code, cache.name],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert out == "hello"
+    assert cache.read("a.mp3") == b"hello"